@@ -2,8 +2,13 @@ from bitbin.impl import *
 from bitbin.core import *
 from bitbin.config import *
 from bitbin.util import *
+from bitbin.profiling import *
+from bitbin.compiler import *
+from bitbin.records import *
+from bitbin.archive import *
+from bitbin.codegen import *
 
-from bitbin import impl, config, core, util
+from bitbin import impl, config, core, util, profiling, compiler, records, archive, codegen
 
 from construct import this
 
@@ -12,9 +17,19 @@ __all__ = (
     'config',
     'core',
     'util',
+    'profiling',
+    'compiler',
+    'records',
+    'archive',
+    'codegen',
     'this',
     *impl.__all__,
     *config.__all__,
     *core.__all__,
     *util.__all__,
+    *profiling.__all__,
+    *compiler.__all__,
+    *records.__all__,
+    *archive.__all__,
+    *codegen.__all__,
 )
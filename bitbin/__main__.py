@@ -0,0 +1,43 @@
+"""Command line interface of bitbin."""
+
+import argparse
+import importlib
+import os
+import sys
+
+from bitbin import codegen
+
+
+def _compile(args):
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    modules = [importlib.import_module(name) for name in args.modules]
+    command = f"python -m bitbin compile {' '.join(args.modules)}"
+    header = f'Codecs generated by `{command}`, do not edit.'
+    source, skipped = codegen.generate_codecs(*modules, header=header)
+    for model, reason in skipped.items():
+        print(f'skipped {model.__module__}.{model.__qualname__}: {reason}', file=sys.stderr)
+    if args.output is None:
+        sys.stdout.write(source)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            fp.write(source)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='bitbin')
+    commands = parser.add_subparsers(dest='command', required=True)
+    compile_parser = commands.add_parser(
+        'compile',
+        help='generate a module of load/dump functions for the models of modules'
+    )
+    compile_parser.add_argument('modules', nargs='+', metavar='module')
+    compile_parser.add_argument('-o', '--output', help='file to write to (default: stdout)')
+    compile_parser.set_defaults(handler=_compile)
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
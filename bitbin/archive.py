@@ -0,0 +1,300 @@
+"""Seekable archives of records, grouped in optionally compressed blocks."""
+
+from __future__ import annotations
+
+import bisect
+import collections.abc
+import concurrent.futures
+import io
+import itertools
+import lzma
+import mmap
+import os
+import struct
+import zlib
+
+from bitbin import compiler, core, records
+
+
+__all__ = (
+    'ArchiveWriter',
+    'ArchiveReader',
+)
+
+
+BLOCK_RECORDS = 4096  # default number of records per block
+
+# file layout: header, blocks, index (one entry per block), trailer
+_MAGIC = b'bitbinA1'
+_INDEX_MAGIC = b'bitbinI1'
+_HEADER = struct.Struct('<8s32s')  # magic, schema fingerprint
+_ENTRY = struct.Struct('<QQQB')  # offset, size, record count, codec
+_TRAILER = struct.Struct('<QQ8s')  # index offset, block count, magic
+
+_CODECS = {
+    None: (0, bytes, bytes),
+    'zlib': (1, zlib.compress, zlib.decompress),
+    'lzma': (2, lzma.compress, lzma.decompress),
+}
+_DECOMPRESSORS = {code: decompress for code, _, decompress in _CODECS.values()}
+
+
+def _fingerprint(model):
+    digest = compiler.fingerprint(model)
+    return bytes(32) if digest is None else bytes.fromhex(digest)
+
+
+def _check_fingerprint(model, fingerprint, path):
+    expected = _fingerprint(model)
+    if any(fingerprint) and any(expected) and fingerprint != expected:
+        raise ValueError(f'{path!r} does not hold records of {model.__name__}')
+
+
+def _find_trailer(fp, size, path):
+    """Return where the last complete trailer ends, ignoring blocks an unclosed writer left."""
+    with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        end = size
+        while True:
+            found = data.rfind(_INDEX_MAGIC, _HEADER.size, end)
+            if found == -1:
+                raise ValueError(f'{path!r} is not a bitbin archive')
+            trailer = found + len(_INDEX_MAGIC) - _TRAILER.size
+            if trailer >= _HEADER.size:
+                index_offset, block_count, _ = _TRAILER.unpack_from(data, trailer)
+                if index_offset + block_count * _ENTRY.size == trailer:
+                    return trailer + _TRAILER.size
+            end = found + len(_INDEX_MAGIC) - 1
+
+
+def _read_index(fp, path):
+    fp.seek(0, os.SEEK_END)
+    size = fp.tell()
+    if size < _HEADER.size + _TRAILER.size:
+        raise ValueError(f'{path!r} is not a bitbin archive')
+    fp.seek(0)
+    magic, fingerprint = _HEADER.unpack(fp.read(_HEADER.size))
+    if magic != _MAGIC:
+        raise ValueError(f'{path!r} is not a bitbin archive')
+    end = _find_trailer(fp, size, path)
+    fp.seek(end - _TRAILER.size)
+    index_offset, block_count, _ = _TRAILER.unpack(fp.read(_TRAILER.size))
+    fp.seek(index_offset)
+    entries = list(_ENTRY.iter_unpack(fp.read(block_count * _ENTRY.size)))
+    return fingerprint, end, entries
+
+
+class ArchiveWriter:
+    """
+    Write records to an archive, block by block.
+
+    Every block holds up to block_records dumped records and is compressed
+    with the given codec (None, 'zlib' or 'lzma'). With append=True, new blocks
+    are added to an existing archive of the same model, possibly with another codec.
+    The index is written when the writer is closed. New blocks are written after
+    the previous index, so an archive that was appended to by a writer that never
+    got closed still reads as it was before. The previous index stays in the file
+    as dead space though: every append grows the archive by the size of the index
+    it replaced (24 bytes plus 25 bytes per block). Archives appended to many times
+    can be compacted by copying their records into a new archive.
+    """
+
+    def __init__(
+            self, model, path, *,
+            compression=None,
+            block_records=BLOCK_RECORDS,
+            append=False,
+            **context
+    ):
+        if compression not in _CODECS:
+            raise ValueError(f'unknown compression {compression!r}')
+        self.model = model
+        self.context = context
+        self.block_records = block_records
+        self._codec, self._compress, _ = _CODECS[compression]
+        self._block = io.BytesIO()
+        self._count = 0
+        if append and os.path.exists(path):
+            self._fp = open(path, 'r+b')
+            try:
+                fingerprint, end, self._entries = _read_index(self._fp, path)
+                _check_fingerprint(model, fingerprint, path)
+            except BaseException:
+                self._fp.close()
+                raise
+            # the old index stays valid until close() writes the new one
+            self._fp.seek(end)
+        else:
+            self._fp = open(path, 'wb')
+            self._fp.write(_HEADER.pack(_MAGIC, _fingerprint(model)))
+            self._entries = []
+
+    def write(self, obj):
+        core.dump(self.model, self._block, obj, **self.context)
+        self._count += 1
+        if self._count >= self.block_records:
+            self.flush()
+
+    def write_many(self, objs):
+        for obj in objs:
+            self.write(obj)
+
+    def flush(self):
+        """End the current block and write it out."""
+        if not self._count:
+            return
+        data = self._compress(self._block.getbuffer())
+        self._entries.append((self._fp.tell(), len(data), self._count, self._codec))
+        self._fp.write(data)
+        self._block = io.BytesIO()
+        self._count = 0
+
+    def close(self):
+        if self._fp.closed:
+            return
+        try:
+            self.flush()
+            index_offset = self._fp.tell()
+            self._fp.writelines(_ENTRY.pack(*entry) for entry in self._entries)
+            self._fp.write(_TRAILER.pack(index_offset, len(self._entries), _INDEX_MAGIC))
+            # drop whatever an earlier unclosed writer left after its blocks
+            self._fp.truncate()
+        finally:
+            self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ArchiveReader(collections.abc.Sequence):
+    """
+    Random access to the records of an archive, backed by mmap.
+
+    Only the blocks holding accessed records are decompressed, the last one is kept.
+    Records of a fixed size are loaded one by one from their block,
+    others by loading the block up to them. With trusted=True (or False),
+    checks are skipped (or not) regardless of config.set_trusted().
+    """
+
+    def __init__(self, model, path, *, as_record=False, trusted=None, **context):
+        self.model = model
+        self.as_record = as_record
+        self.trusted = trusted
+        self.context = context
+        with open(path, 'rb') as fp:
+            fingerprint, _, self._entries = _read_index(fp, path)
+            _check_fingerprint(model, fingerprint, path)
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._starts = [0, *itertools.accumulate(count for _, _, count, _ in self._entries)]
+        self._record_size = model._sizeof() if model._layout() is not None else None
+        self._cached = (None, None)
+
+    def __len__(self):
+        return self._starts[-1]
+
+    @property
+    def block_count(self):
+        return len(self._entries)
+
+    def _block_data(self, block):
+        offset, size, count, codec = self._entries[block]
+        data = self._buffer[offset:offset + size]
+        return data if codec == 0 else _DECOMPRESSORS[codec](data)
+
+    def _data(self, block):
+        cached_block, data = self._cached
+        if cached_block != block:
+            data = self._block_data(block)
+            self._cached = (block, data)
+        return data
+
+    def _load(self, stream):
+        if self.trusted is not None:
+            # set here, since blocks may be decoded in other threads
+            token = core._trusted.set(self.trusted)
+            try:
+                return self._load_one(stream)
+            finally:
+                core._trusted.reset(token)
+        return self._load_one(stream)
+
+    def _load_one(self, stream):
+        context = dict(self.context)
+        parsed = core._current_construct(self.model).parse_stream(stream, **context)
+        if self.as_record:
+            return self.model._load_record(parsed, context)
+        return self.model._load(parsed, context)
+
+    def _decode(self, data, count):
+        stream = io.BytesIO(data)
+        return [self._load(stream) for _ in range(count)]
+
+    def read_block(self, block):
+        """Load all the records of a block."""
+        return self._decode(self._data(block), self._entries[block][2])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('record index out of range')
+        block = bisect.bisect_right(self._starts, index) - 1
+        position = index - self._starts[block]
+        data = self._data(block)
+        if self._record_size is None:
+            stream = io.BytesIO(data)
+            for _ in range(position):
+                self._load(stream)
+            return self._load(stream)
+        start = position * self._record_size
+        return self._load(io.BytesIO(data[start:start + self._record_size]))
+
+    def __iter__(self):
+        for block in range(self.block_count):
+            yield from self._decode(self._block_data(block), self._entries[block][2])
+
+    def _read_blocks(self, blocks):
+        return [
+            record
+            for block in blocks
+            for record in self._decode(self._block_data(block), self._entries[block][2])
+        ]
+
+    def read_all(self, *, max_workers=None, executor=None):
+        """
+        Load every record, decompressing and decoding blocks in parallel.
+
+        As with records.loads_many(), blocks are decoded in this thread
+        if the GIL is enabled and no executor or max_workers is given.
+        """
+        core.warmup(self.model)
+        if executor is None and max_workers is None and records._gil_enabled():
+            max_workers = 1
+        if executor is None and max_workers == 1:
+            return self._read_blocks(range(self.block_count))
+        if executor is not None:
+            return self._map_blocks(executor)
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            return self._map_blocks(executor)
+
+    def _map_blocks(self, executor):
+        futures = [
+            executor.submit(self._read_blocks, (block,)) for block in range(self.block_count)
+        ]
+        return [record for future in futures for record in future.result()]
+
+    def close(self):
+        self._cached = (None, None)
+        self._buffer.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
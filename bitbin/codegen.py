@@ -0,0 +1,472 @@
+"""Ahead-of-time generation of plain Python codecs for models."""
+
+import dataclasses
+import re
+import struct
+
+import construct as _lib
+
+from bitbin import compiler, core, records
+from bitbin.impl import common, features
+
+
+__all__ = (
+    'generate_codecs',
+)
+
+
+_THIS_FIELD_RE = re.compile(r"this\['(\w+)'\]")
+
+_PREAMBLE = '''\
+import struct as _struct
+
+{imports}
+
+_setattr = object.__setattr__
+_extend = list.extend
+_intern = __import__('sys').intern
+
+
+def _take(data, offset, size):
+    end = offset + size
+    if end > len(data):
+        raise ValueError(f'expected {{size}} bytes at offset {{offset}}, '
+                         f'found {{len(data) - offset}}')
+    return data[offset:end], end
+
+
+def _cstring(data, offset):
+    end = data.index(b'\\0', offset)
+    return data[offset:end], end + 1
+'''
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _is_struct(model):
+    # duck-typed, since set_endianness() reloads bitbin.core
+    return (
+        isinstance(model, type)
+        and getattr(model, '_is_model', False)
+        and dataclasses.is_dataclass(model)
+        and getattr(model, '_impl', None) is _lib.Struct
+    )
+
+
+def _is_sequence(model):
+    return (
+        isinstance(model, type)
+        and issubclass(model, list)
+        and getattr(model, '_is_model', False)
+        and bool(getattr(model, '_models', None))
+    )
+
+
+def _this_field(expression):
+    match = _THIS_FIELD_RE.fullmatch(repr(expression))
+    return match and match.group(1)
+
+
+def _string_codec(construct):
+    """Return (kind, encoding, length struct) of string constructs, or None."""
+    if isinstance(construct, common._InternedString):
+        if construct._term == b'\0':
+            return 'interned', construct.encoding, None
+        return None
+    if not isinstance(construct, _lib.StringEncoded):
+        return None
+    subcon = construct.subcon
+    if (
+        isinstance(subcon, _lib.NullTerminated) and subcon.subcon is _lib.GreedyBytes
+        and subcon.term == b'\0' and not subcon.include and subcon.consume and subcon.require
+    ):
+        return 'cstring', construct.encoding, None
+    if (
+        isinstance(subcon, _lib.Prefixed) and subcon.subcon is _lib.GreedyBytes
+        and isinstance(subcon.lengthfield, _lib.FormatField) and not subcon.includelength
+    ):
+        return 'pascal', construct.encoding, subcon.lengthfield.fmtstr
+    return None
+
+
+class _Generator:
+    def __init__(self):
+        self.imports = {}
+        self.structs = {}
+        self.names = {}
+        self.functions = []
+        self.fingerprints = {}
+        self.skipped = {}
+        self._pending = set()
+
+    def module_alias(self, module):
+        if module not in self.imports:
+            self.imports[module] = f'_m{len(self.imports)}'
+        return self.imports[module]
+
+    def struct(self, fmt):
+        if fmt not in self.structs:
+            self.structs[fmt] = f'_S{len(self.structs)}'
+        return self.structs[fmt]
+
+    def add(self, model):
+        """Generate the codec of a model and its nested models, return its name."""
+        if model in self.names:
+            return self.names[model]
+        if model in self.skipped:
+            raise _Unsupported(f'{model.__name__} is not supported: {self.skipped[model]}')
+        if model in self._pending:
+            raise _Unsupported(f'{model.__name__} is recursive')
+        if not (_is_struct(model) or _is_sequence(model)):
+            raise _Unsupported(f'{model!r} is not a Struct or Sequence')
+        if getattr(model, '_retain_source', False):
+            raise _Unsupported(f'{model.__name__} retains its source')
+        self._pending.add(model)
+        try:
+            source = self._codec(model)
+        except _Unsupported as exc:
+            self.skipped[model] = str(exc)
+            raise
+        finally:
+            self._pending.discard(model)
+        self.functions.append(source)
+        self.fingerprints[self.names[model]] = compiler.fingerprint(model)
+        return self.names[model]
+
+    def _codec(self, model):
+        name = model.__name__
+        taken = set(self.names.values())
+        while name in taken:
+            name += '_'
+        alias = self.module_alias(model.__module__)
+        if _is_struct(model):
+            fields = [
+                (f.name, f.metadata['model'], f'obj.{f.name}') for f in dataclasses.fields(model)
+            ]
+        else:
+            fields = [
+                (f'_{index}', field_model, f'obj[{index}]')
+                for index, field_model in enumerate(model._models)
+            ]
+        loader = _Body(self, 'data', {field_name for field_name, _, _ in fields})
+        dumper = _Body(self, 'out', {field_name for field_name, _, _ in fields})
+        for field_name, field_model, getter in fields:
+            loader.load(field_model, f'f_{field_name}')
+            dumper.dump(field_model, getter, field_name)
+        loader.flush_load()
+        dumper.flush_dump()
+        self.names[model] = name
+        lines = [
+            f'_{name} = {alias}.{model.__qualname__}',
+            '',
+            '',
+            f'def load_{name}(data, offset=0):',
+            *loader.lines,
+            f'    obj = _{name}.__new__(_{name})',
+        ]
+        if _is_struct(model):
+            lines.extend(
+                f"    _setattr(obj, '{field_name}', f_{field_name})" for field_name, _, _ in fields
+            )
+        else:
+            values = ''.join(f'f_{field_name}, ' for field_name, _, _ in fields)
+            lines.append(f'    _extend(obj, ({values}))')
+        lines += [
+            '    return obj, offset',
+            '',
+            '',
+            f'def dump_{name}(obj, out):',
+            *dumper.lines,
+            '',
+            '',
+            f'def loads_{name}(data):',
+            f'    return load_{name}(data)[0]',
+            '',
+            '',
+            f'def dumps_{name}(obj):',
+            '    out = bytearray()',
+            f'    dump_{name}(obj, out)',
+            '    return bytes(out)',
+        ]
+        return '\n'.join(lines)
+
+
+class _Body:
+    """Statements of one load or dump function, with adjacent fixed-size fields packed at once."""
+
+    def __init__(self, generator, buffer, field_names):
+        self.generator = generator
+        self.buffer = buffer
+        self.field_names = field_names
+        self.lines = []
+        self.run = []
+        self.byteorder = None
+        self.counter = 0
+
+    def emit(self, line, indent=1):
+        self.lines.append('    ' * indent + line)
+
+    def temp(self):
+        self.counter += 1
+        return f'_t{self.counter}'
+
+    def _fixed_format(self, model, construct):
+        if getattr(model, '_pass_context', True):
+            return None
+        if construct is _lib.Flag and getattr(model, '_loader', None) is bool:
+            return '<', '?'
+        return records._field_format(model, construct)
+
+    def _run_byteorder(self, byteorder, code):
+        if code.endswith('s') or struct.calcsize(code) == 1:
+            return self.byteorder
+        return byteorder
+
+    def _add_run(self, byteorder, code, value):
+        byteorder = self._run_byteorder(byteorder, code)
+        if self.byteorder is not None and byteorder not in (None, self.byteorder):
+            self.flush()
+        if self.byteorder is None:
+            self.byteorder = byteorder
+        self.run.append((code, value))
+
+    def flush(self):
+        if self.buffer == 'data':
+            self.flush_load()
+        else:
+            self.flush_dump()
+
+    def _run_struct(self):
+        fmt = (self.byteorder or '<') + ''.join(code for code, _ in self.run)
+        return self.generator.struct(fmt), struct.calcsize(fmt)
+
+    def flush_load(self):
+        if not self.run:
+            return
+        name, size = self._run_struct()
+        targets = ''.join(f'{target}, ' for _, target in self.run)
+        self.emit(f'{targets}= {name}.unpack_from(data, offset)')
+        self.emit(f'offset += {size}')
+        self.run = []
+        self.byteorder = None
+
+    def flush_dump(self):
+        if not self.run:
+            return
+        name, _ = self._run_struct()
+        self.emit(f"out += {name}.pack({', '.join(value for _, value in self.run)})")
+        self.run = []
+        self.byteorder = None
+
+    def _count(self, model):
+        count = getattr(model, 'count', None)
+        if isinstance(count, int):
+            return str(count)
+        field_name = _this_field(count)
+        if field_name is None or field_name not in self.field_names:
+            raise _Unsupported(f'array count {count!r} is not a field of the same model')
+        return field_name
+
+    def _array(self, model):
+        if not isinstance(model, features.Array) or model.discard:
+            return None
+        if model.type not in (list, tuple) or model._batch_adapter() is not None:
+            raise _Unsupported(f'array of type {model.type!r} is not supported')
+        return self._count(model), model.model
+
+    def load(self, model, target, indent=1):
+        construct = None if isinstance(model, type) else model._construct()
+        fixed = construct is not None and self._fixed_format(model, construct)
+        if fixed and indent == 1:
+            self._add_run(*fixed, target)
+            return
+        self.flush_load()
+        if fixed:
+            name = self.generator.struct(''.join(fixed))
+            self.emit(f'{target}, = {name}.unpack_from(data, offset)', indent)
+            self.emit(f"offset += {struct.calcsize(''.join(fixed))}", indent)
+            return
+        if isinstance(model, type):
+            name = self.generator.add(model)
+            self.emit(f'{target}, offset = load_{name}(data, offset)', indent)
+            return
+        array = self._array(model)
+        if array is not None:
+            self._load_array(model, target, indent, *array)
+            return
+        string = _string_codec(construct)
+        if string is not None:
+            self._load_string(target, indent, *string)
+            return
+        if (
+            isinstance(construct, _lib.BytesInteger) and isinstance(construct.length, int)
+            and isinstance(construct.swapped, bool) and getattr(model, '_loader', None) is int
+            and not model._pass_context
+        ):
+            byteorder = 'little' if construct.swapped else 'big'
+            raw = self.temp()
+            self.emit(f'{raw}, offset = _take(data, offset, {construct.length})', indent)
+            self.emit(
+                f"{target} = int.from_bytes({raw}, '{byteorder}', signed={construct.signed})",
+                indent
+            )
+            return
+        raise _Unsupported(f'field model {core._model_name(model)} is not supported')
+
+    def _load_array(self, model, target, indent, count, element):
+        if count in self.field_names:
+            count = f'f_{count}'
+        element_construct = None if isinstance(element, type) else element._construct()
+        fixed = element_construct is not None and self._fixed_format(element, element_construct)
+        if fixed and not fixed[1].endswith('s'):
+            byteorder, code = fixed
+            self.emit(
+                f"{target} = {model.type.__name__}(_struct.unpack_from("
+                f"f'{byteorder}{{{count}}}{code}', data, offset))",
+                indent
+            )
+            self.emit(f'offset += {count} * {struct.calcsize(code)}', indent)
+            return
+        item = self.temp()
+        self.emit(f'{target} = []', indent)
+        self.emit(f'for _ in range({count}):', indent)
+        self.load(element, item, indent + 1)
+        self.emit(f'{target}.append({item})', indent + 1)
+        if model.type is tuple:
+            self.emit(f'{target} = tuple({target})', indent)
+
+    def _load_string(self, target, indent, kind, encoding, length_format):
+        raw = self.temp()
+        if kind == 'pascal':
+            name = self.generator.struct(length_format)
+            self.emit(f'{raw}, = {name}.unpack_from(data, offset)', indent)
+            self.emit(
+                f'{raw}, offset = _take(data, offset + {struct.calcsize(length_format)}, {raw})',
+                indent
+            )
+        else:
+            self.emit(f'{raw}, offset = _cstring(data, offset)', indent)
+        decoded = f'{raw}.decode({encoding!r})'
+        self.emit(f'{target} = {"_intern(" + decoded + ")" if kind == "interned" else decoded}',
+                  indent)
+
+    def dump(self, model, value, field_name=None, indent=1):
+        construct = None if isinstance(model, type) else model._construct()
+        fixed = construct is not None and self._fixed_format(model, construct)
+        if fixed and fixed[1].endswith('s'):
+            self.emit(f'if len({value}) != {fixed[1][:-1]}:', indent)
+            self.emit(
+                f"raise ValueError(f'expected {fixed[1][:-1]} bytes, "
+                f"found {{len({value})}}')",
+                indent + 1
+            )
+        if fixed and indent == 1:
+            self._add_run(*fixed, value)
+            return
+        self.flush_dump()
+        if fixed:
+            self.emit(f"out += {self.generator.struct(''.join(fixed))}.pack({value})", indent)
+            return
+        if isinstance(model, type):
+            self.emit(f'dump_{self.generator.add(model)}({value}, out)', indent)
+            return
+        array = self._array(model)
+        if array is not None:
+            self._dump_array(value, indent, *array)
+            return
+        string = _string_codec(construct)
+        if string is not None:
+            kind, encoding, length_format = string
+            if kind == 'pascal':
+                raw = self.temp()
+                name = self.generator.struct(length_format)
+                self.emit(f'{raw} = {value}.encode({encoding!r})', indent)
+                self.emit(f'out += {name}.pack(len({raw}))', indent)
+                self.emit(f'out += {raw}', indent)
+            else:
+                self.emit(f"out += {value}.encode({encoding!r}) + b'\\0'", indent)
+            return
+        if isinstance(construct, _lib.BytesInteger):
+            byteorder = 'little' if construct.swapped else 'big'
+            self.emit(
+                f"out += {value}.to_bytes({construct.length}, '{byteorder}', "
+                f"signed={construct.signed})",
+                indent
+            )
+            return
+        raise _Unsupported(f'field model {core._model_name(model)} is not supported')
+
+    def _dump_array(self, value, indent, count, element):
+        items = self.temp()
+        self.emit(f'{items} = {value}', indent)
+        if count in self.field_names:
+            count = f'obj.{count}'
+        self.emit(f'if len({items}) != {count}:', indent)
+        self.emit(
+            f"raise ValueError(f'expected {{{count}}} elements, found {{len({items})}}')",
+            indent + 1
+        )
+        element_construct = None if isinstance(element, type) else element._construct()
+        fixed = element_construct is not None and self._fixed_format(element, element_construct)
+        if fixed and not fixed[1].endswith('s'):
+            byteorder, code = fixed
+            self.emit(f"out += _struct.pack(f'{byteorder}{{len({items})}}{code}', *{items})",
+                      indent)
+            return
+        item = self.temp()
+        self.emit(f'for {item} in {items}:', indent)
+        self.dump(element, item, indent=indent + 1)
+
+
+def _module_models(module):
+    return [
+        value for value in vars(module).values()
+        if (_is_struct(value) or _is_sequence(value))
+        and value.__module__ == module.__name__
+        and not value.__qualname__.startswith('_')
+    ]
+
+
+def generate_codecs(*modules, header=None):
+    """
+    Generate the source of a module with load/dump functions for the models of modules.
+
+    For every Struct or Sequence model (and the models they nest), the module defines
+    load_<Model>(data, offset=0) -> (instance, offset), dump_<Model>(instance, bytearray),
+    loads_<Model>(data) and dumps_<Model>(instance). They work on bytes or bytearray,
+    dump model instances only, and do not validate more than the struct module does.
+    Return the source and a dict of the models that could not be generated, with reasons.
+    """
+    generator = _Generator()
+    for module in modules:
+        for model in _module_models(module):
+            try:
+                generator.add(model)
+            except _Unsupported:
+                pass
+    imports = '\n'.join(
+        f'import {module} as {alias}' for module, alias in generator.imports.items()
+    )
+    structs = '\n'.join(
+        f'{name} = _struct.Struct({fmt!r})' for fmt, name in generator.structs.items()
+    )
+    fingerprints = ''.join(
+        f'    {name!r}: {digest!r},\n' for name, digest in generator.fingerprints.items()
+    )
+    parts = [
+        f'"""{header or "Codecs generated by bitbin, do not edit."}"""',
+        '',
+        _PREAMBLE.format(imports=imports),
+        '',
+        '# schema fingerprints of the models the codecs were generated from',
+        f'FINGERPRINTS = {{\n{fingerprints}}}',
+        '',
+        structs,
+        '',
+        '',
+        '\n\n\n'.join(generator.functions),
+        '',
+    ]
+    return '\n'.join(parts), generator.skipped
@@ -0,0 +1,267 @@
+"""Compilation of constructs with a persistent cache keyed by schema fingerprint."""
+
+import functools
+import hashlib
+import marshal
+import os
+import re
+import sys
+import tempfile
+import types
+
+import construct as _lib
+from construct.core import extractfield
+
+from bitbin import config
+
+
+__all__ = (
+    'fingerprint',
+    'compile_construct',
+)
+
+
+_CACHE_FORMAT = 1
+_PRIMITIVES = (str, bytes, int, float, bool, type(None))
+_LINKED_RE = re.compile(r'(linked(?:instances|parsers|builders))\[(\d+)]')
+
+
+class _Unstable(Exception):
+    pass
+
+
+def _children(node):
+    for attr, value in sorted(vars(node).items()):
+        if isinstance(value, _lib.Construct):
+            yield (attr,), value
+        elif isinstance(value, (list, tuple)):
+            for index, item in enumerate(value):
+                if isinstance(item, _lib.Construct):
+                    yield (attr, index), item
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                if isinstance(item, _lib.Construct):
+                    yield (attr, key), item
+
+
+def _feed_value(digest, value):
+    if isinstance(value, _PRIMITIVES):
+        digest.update(repr(value).encode())
+    elif isinstance(value, _lib.Construct):
+        _feed_construct(digest, value)
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'[')
+        for item in value:
+            _feed_value(digest, item)
+            digest.update(b',')
+        digest.update(b']')
+    elif isinstance(value, dict):
+        digest.update(b'{')
+        for key, item in sorted(value.items(), key=lambda kv: repr(kv[0])):
+            _feed_value(digest, key)
+            digest.update(b':')
+            _feed_value(digest, item)
+            digest.update(b',')
+        digest.update(b'}')
+    elif isinstance(value, (set, frozenset)):
+        digest.update(b'{')
+        for item in sorted(value, key=repr):
+            _feed_value(digest, item)
+            digest.update(b',')
+        digest.update(b'}')
+    elif isinstance(value, types.FunctionType):
+        _feed_function(digest, value)
+    else:
+        text = repr(value)
+        if ' at 0x' in text:
+            raise _Unstable(text)
+        digest.update(f'{type(value).__qualname__}:{text}'.encode())
+
+
+def _feed_code(digest, code):
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _feed_code(digest, const)
+        else:
+            _feed_value(digest, const)
+        digest.update(b',')
+
+
+def _feed_function(digest, func):
+    """Feed the code of a function and the values it closes over, or the globals it reads."""
+    digest.update(f'{func.__module__}.{func.__qualname__}'.encode())
+    _feed_code(digest, func.__code__)
+    _feed_value(digest, func.__defaults__)
+    _feed_value(digest, func.__kwdefaults__)
+    for cell in func.__closure__ or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:  # not assigned yet
+            raise _Unstable(func.__qualname__) from None
+        _feed_value(digest, contents)
+    for name in func.__code__.co_names:
+        value = func.__globals__.get(name)
+        if isinstance(value, _PRIMITIVES):
+            digest.update(f'{name}='.encode())
+            _feed_value(digest, value)
+
+
+@functools.lru_cache(maxsize=None)
+def _class_digest(cls):
+    """Return a digest of the code of bitbin's own construct classes, which may emit code."""
+    digest = hashlib.sha256()
+    for klass in cls.__mro__:
+        if not klass.__module__.startswith('bitbin'):
+            continue
+        for name, attr in sorted(vars(klass).items()):
+            attr = getattr(attr, '__func__', attr)
+            if isinstance(attr, types.FunctionType):
+                digest.update(f'{name}:'.encode())
+                _feed_code(digest, attr.__code__)
+    return digest.digest()
+
+
+def _feed_construct(digest, node):
+    if isinstance(node, _lib.Compiled):
+        node = node.defersubcon
+    digest.update(f'<{type(node).__module__}.{type(node).__qualname__}'.encode())
+    if type(node).__module__.startswith('bitbin'):
+        digest.update(_class_digest(type(node)))
+    for attr, value in sorted(vars(node).items()):
+        if attr in ('docs', '_subcons'):
+            continue
+        digest.update(f' {attr}='.encode())
+        _feed_value(digest, value)
+    digest.update(b'>')
+
+
+def fingerprint(model):
+    """
+    Return a stable hex digest of the schema of a model (or a bare construct).
+
+    Functions are identified by their code and the values they close over,
+    and bitbin's own constructs by the code of their classes, so that upgrading
+    bitbin invalidates cached code. Returns None if the schema contains objects
+    that cannot be identified across processes, such as instances with identity-based reprs.
+    """
+    construct = model if isinstance(model, _lib.Construct) else model._construct()
+    digest = hashlib.sha256()
+    digest.update(f'{_CACHE_FORMAT}:{_lib.__version__}:{config.ENDIANNESS}:'.encode())
+    try:
+        _feed_construct(digest, construct)
+    except _Unstable:
+        return None
+    return digest.hexdigest()
+
+
+def _paths_by_id(construct):
+    paths = {}
+    stack = [((), construct)]
+    while stack:
+        path, node = stack.pop()
+        if id(node) in paths:
+            continue
+        paths[id(node)] = path
+        for subpath, child in _children(node):
+            stack.append((path + subpath, child))
+    return paths
+
+
+def _resolve(construct, path):
+    node = construct
+    for step in path:
+        if isinstance(node, (list, tuple, dict)):
+            node = node[step]
+        else:
+            node = getattr(node, step)
+    return node
+
+
+def _cache_path(cache_dir, key):
+    return os.path.join(cache_dir, f'{key}.{sys.implementation.cache_tag}.bbc')
+
+
+def _make_entry(construct, compiled):
+    paths = _paths_by_id(construct)
+    ordinals = {}
+    linked_paths = []
+    for match in _LINKED_RE.finditer(compiled.source):
+        linked_id = int(match.group(2))
+        if linked_id in ordinals:
+            continue
+        path = paths.get(linked_id)
+        if path is None or not all(isinstance(step, (str, int)) for step in path):
+            return None
+        ordinals[linked_id] = len(linked_paths)
+        linked_paths.append(path)
+    source = _LINKED_RE.sub(
+        lambda match: f'{match.group(1)}[{ordinals[int(match.group(2))]}]',
+        compiled.source
+    )
+    code = compile(source, '', 'exec')
+    return _CACHE_FORMAT, source, code, tuple(linked_paths)
+
+
+def _restore_entry(construct, entry):
+    cache_format, source, code, linked_paths = entry
+    if cache_format != _CACHE_FORMAT:
+        raise ValueError('stale cache entry')
+    modulename = hashlib.sha1(source.encode()).hexdigest()
+    module = types.ModuleType(modulename)
+    exec(code, module.__dict__)
+    for ordinal, path in enumerate(linked_paths):
+        field = extractfield(_resolve(construct, path))
+        module.linkedinstances[ordinal] = field
+        module.linkedparsers[ordinal] = field._parse
+        module.linkedbuilders[ordinal] = field._build
+    compiled = module.compiled
+    compiled.source = source
+    compiled.module = module
+    compiled.modulename = modulename
+    compiled.defersubcon = construct
+    return compiled
+
+
+def _write_entry(path, entry):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            marshal.dump(entry, fp)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def compile_construct(construct, cache_dir=None):
+    """
+    Compile a construct, reusing the code cached on disk for the same schema.
+
+    The cache directory defaults to config.CACHE_DIR.
+    If no cache directory is configured, this is equivalent to construct.compile().
+    """
+    if cache_dir is None:
+        cache_dir = config.CACHE_DIR
+    if not cache_dir:
+        return construct.compile()
+    key = fingerprint(construct)
+    if key is None:
+        return construct.compile()
+    path = _cache_path(cache_dir, key)
+    try:
+        with open(path, 'rb') as fp:
+            return _restore_entry(construct, marshal.load(fp))
+    except (OSError, EOFError, ValueError, TypeError, LookupError, AttributeError):
+        pass
+    compiled = construct.compile()
+    entry = _make_entry(construct, compiled)
+    if entry is not None:
+        try:
+            _write_entry(path, entry)
+        except OSError:
+            pass
+    return compiled
@@ -2,7 +2,9 @@
 
 import functools
 import importlib
+import os
 import sys
+import threading
 
 import construct as _lib
 
@@ -17,6 +19,10 @@ __all__ = (
     'ENDIANNESS',
     'DEFAULT_ENCODING',
     'VALID_ENDIANNESSES',
+    'CACHE_DIR',
+    'set_cache_dir',
+    'TRUSTED',
+    'set_trusted',
 )
 
 
@@ -24,11 +30,15 @@ DEFAULT_ENCODING = 'UTF-8'
 MOCK_STRING = '\0'
 
 
+_encodings_lock = threading.Lock()
+
+
 @functools.lru_cache(0)
 def register_encoding(encoding, unit_size=None):
     if unit_size is None:
         unit_size = len(MOCK_STRING.encode(encoding))
-    _lib.possiblestringencodings[encoding] = unit_size
+    with _encodings_lock:
+        _lib.possiblestringencodings[encoding] = unit_size
 
 
 class Endianness:
@@ -64,3 +74,20 @@ def set_endianness(endianness):
     ENDIANNESS = endianness
     from bitbin import core
     importlib.reload(core)
+
+
+CACHE_DIR = os.environ.get('BITBIN_CACHE_DIR') or None
+
+
+def set_cache_dir(path):
+    global CACHE_DIR
+    CACHE_DIR = os.fspath(path) if path is not None else None
+
+
+TRUSTED = False
+
+
+def set_trusted(enabled=True):
+    """Skip validation of all loaded and dumped data, unless overridden per call."""
+    global TRUSTED
+    TRUSTED = bool(enabled)
@@ -1,19 +1,35 @@
 from __future__ import annotations
 
+import collections as _collections
 import contextlib
+import contextvars
+import copy
 import dataclasses
 import functools
 import inspect
+import io
+import itertools
+import threading
 import typing
+import weakref
 from typing import Generic, TypeVar
 
 import construct as _lib
 
+from bitbin import compiler
+from bitbin import config
 from bitbin import util
 
 __all__ = (
     'load', 'loads',
     'dump', 'dumps',
+    'iter_load', 'dump_iter',
+    'bind', 'flush',
+    'skip', 'skip_bytes',
+    'is_trusted',
+    'registered_models', 'warmup',
+    'record_type',
+    'not_loaded',
     'field',
     'AnnotationManager',
     'Model',
@@ -23,11 +39,29 @@ __all__ = (
 )
 
 
-def load(model, fp, **context):
-    return load(model, fp.read(), **context)
+def load(model, fp, *, fields=None, trusted=None, **context):
+    if trusted is not None:
+        token = _trusted.set(trusted)
+        try:
+            return load(model, fp, fields=fields, **context)
+        finally:
+            _trusted.reset(token)
+    if fields is not None:
+        return _load_fields(model, fp, fields, context)
+    return model._load(_current_construct(model).parse_stream(fp, **context), context)
 
 
-def loads(model, data, **context):
+def loads(model, data, *, as_record=False, fields=None, trusted=None, **context):
+    if trusted is not None:
+        token = _trusted.set(trusted)
+        try:
+            return loads(model, data, as_record=as_record, fields=fields, **context)
+        finally:
+            _trusted.reset(token)
+    if fields is not None:
+        return _load_fields(model, _BufferStream(data), fields, context)
+    if as_record:
+        return model._load_record(data, context)
     return model._load(data, context)
 
 
@@ -40,17 +74,239 @@ def dump(model, fp, *args, **kwargs):
 missing = dataclasses.MISSING
 
 
-def dumps(model, initializer=missing, /, **context):
+def dumps(model, initializer=missing, /, *, trusted=None, **context):
+    if trusted is not None:
+        token = _trusted.set(trusted)
+        try:
+            return dumps(model, initializer, **context)
+        finally:
+            _trusted.reset(token)
     instance = model
     if initializer is not missing:
         instance = model._init(initializer)
     return instance._dump(**context)
 
 
+def iter_load(model, fp, *, trusted=None, **context):
+    """
+    Load the elements of a GreedyRange or RepeatUntil model one by one, as they are parsed.
+
+    Elements are not collected, so a stream of records of any length is read
+    in constant memory. As with discard=True, RepeatUntil predicates are passed an empty list.
+    """
+    if trusted is not None:
+        return _iter_in_context(trusted, model, fp, context)
+    hook = getattr(model, '_iter_load', None)
+    if hook is not None:
+        return hook(fp, context)
+    return _iter_elements(model, _current_construct(model), fp, context, None)
+
+
+def _iter_in_context(trusted, model, fp, context):
+    # elements are parsed lazily, so trusted must be set whenever the iterator resumes
+    run = contextvars.copy_context().run
+    run(_trusted.set, trusted)
+    elements = run(iter_load, model, fp, **context)
+    while True:
+        try:
+            element = run(next, elements)
+        except StopIteration:
+            return
+        yield element
+
+
+def dump_iter(model, fp, iterable, *, trusted=None, **context):
+    """
+    Dump the elements of a GreedyRange or RepeatUntil model from an iterable, one by one.
+
+    Return the number of elements dumped.
+    """
+    if trusted is not None:
+        token = _trusted.set(trusted)
+        try:
+            return dump_iter(model, fp, iterable, **context)
+        finally:
+            _trusted.reset(token)
+    hook = getattr(model, '_dump_iter', None)
+    if hook is not None:
+        return hook(fp, iterable, context)
+    return _dump_elements(model, _current_construct(model), fp, iterable, context, None)
+
+
+_trusted = contextvars.ContextVar('trusted', default=None)
+
+
+def is_trusted():
+    """Return whether checks are skipped, per loads(..., trusted=...) or config.set_trusted()."""
+    trusted = _trusted.get()
+    return config.TRUSTED if trusted is None else trusted
+
+
+def _current_construct(model):
+    """Return the construct of a model, without its checks if they are to be skipped."""
+    trusted_construct = getattr(model, '_trusted_construct', None)
+    if trusted_construct is not None and is_trusted():
+        return trusted_construct()
+    return model._construct()
+
+
+def bind(model, buffer, offset=0, **context):
+    """
+    Load a fixed-size model instance that stays bound to its bytes in a writable buffer.
+
+    Assignments to fields of the bound instance are tracked and flush() (or dumps())
+    patches only the assigned fields' bytes in the buffer instead of rebuilding
+    the whole structure. In-place mutation of nested values is not tracked.
+    The instance is of a cached subclass of the model that tracks assignments,
+    instances of the model itself are left alone.
+    """
+    layout = model._layout()
+    if layout is None:
+        raise TypeError(f'{model.__name__} does not have a fixed-size layout')
+    size = model._sizeof()
+    view = memoryview(buffer)[offset:offset + size]
+    if view.readonly:
+        raise TypeError('cannot bind to a read-only buffer')
+    if len(view) != size:
+        raise ValueError(f'buffer too short for {model.__name__} at offset {offset}')
+    bound = model._bound_type()
+    instance = bound._load_from_container(model._parse(view, context), context)
+    object.__setattr__(instance, '_source', view)
+    object.__setattr__(instance, '_dirty', set())
+    return instance
+
+
+def flush(instance):
+    """Write assigned fields of a bound instance to its buffer, return how many were written."""
+    return instance._flush()
+
+
+def skip(model, stream, **context):
+    """
+    Advance a stream past one encoded message of a model without loading it.
+
+    Fields of static size are seeked over, Prefixed and null-terminated data is
+    skipped by its length field or terminator, and only small scalars are parsed,
+    so that later fields may still refer to them. Return the number of bytes skipped.
+    """
+    seekable = stream.seekable()
+    if not seekable:
+        stream = _CountingReader(stream)
+    start = _lib.stream_tell(stream, '(skipping)')
+    _skip(model._construct(), stream, _parsing_context(context), '(skipping)')
+    if seekable:
+        _check_skipped(stream, model)
+    return _lib.stream_tell(stream, '(skipping)') - start
+
+
+def skip_bytes(model, buffer, offset=0, **context):
+    """Return the offset right after the message of a model encoded at an offset of a buffer."""
+    stream = _BufferStream(buffer, offset)
+    skip(model, stream, **context)
+    return stream.tell()
+
+
+def _load_fields(model, stream, fields, context):
+    """
+    Load only some fields of a model instance, skipping over the others.
+
+    Fields that were not loaded are set to not_loaded. Such an instance
+    can be compared and printed, but not dumped. Raise ValueError
+    if any of the fields is not a field of the model.
+    """
+    if not (isinstance(model, type) and dataclasses.is_dataclass(model)):
+        raise TypeError(f'{_model_name(model)} cannot load a subset of its fields')
+    fields = {fields} if isinstance(fields, str) else set(fields)
+    missing = fields.difference(f.name for f in dataclasses.fields(model))
+    if missing:
+        raise ValueError(f'{model.__name__} has no fields {sorted(missing)!r}')
+    construct = model._construct()
+    if isinstance(construct, _lib.Compiled):
+        construct = construct.defersubcon
+    if isinstance(construct, _Sourced):
+        construct = construct.subcon
+    if not isinstance(construct, _lib.Struct):
+        raise TypeError(f'{model.__name__} cannot load a subset of its fields')
+    data = _skip_fields(construct, stream, _parsing_context(context), '(parsing)', fields)
+    if stream.seekable():
+        _check_skipped(stream, model)
+    instance = model.__new__(model)
+    for f in dataclasses.fields(model):
+        name = f.name
+        if name in fields:
+            value = f.metadata['model']._load(data[name], context)
+            context[name] = value
+        else:
+            if name in data:
+                # parsed while skipping, later fields such as a Switch may refer to it
+                context[name] = data[name]
+            value = not_loaded
+        object.__setattr__(instance, name, value)
+    return instance
+
+
+class _NotLoaded:
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<not loaded>'
+
+    def __reduce__(self):
+        return 'not_loaded'
+
+    def _get_storage(self):
+        raise ValueError('cannot dump a field that was not loaded')
+
+
+not_loaded = _NotLoaded()
+
+
+def record_type(model):
+    """Return the immutable tuple-backed record type loads(model, ..., as_record=True) makes."""
+    return model._record_type()
+
+
+# guards the lazily built caches of model classes, built once and then only read
+_cache_lock = threading.RLock()
+_registry = weakref.WeakSet()
+
+
+def _register(model):
+    _registry.add(model)
+
+
+def registered_models():
+    """Return all defined storage-based models (dataclasses and sequences)."""
+    return list(_registry)
+
+
+def warmup(*models, recursive=True):
+    """
+    Build (and compile) the cached constructs of models ahead of their first use.
+
+    Warms up all registered models if none are given. With recursive=True,
+    nested models, feature arguments and Switch cases are warmed up as well.
+    Return the number of models warmed up.
+    """
+    pending = list(models or registered_models())
+    seen = set()
+    while pending:
+        model = pending.pop()
+        if id(model) in seen:
+            continue
+        seen.add(id(model))
+        model._warmup()
+        if recursive:
+            pending.extend(model._submodels())
+    return len(seen)
+
+
 T = TypeVar('T')
 
 
 class Model(Generic[T]):
+    __slots__ = ()
+
     _is_model = True
     _storage_based = False
 
@@ -61,6 +317,9 @@ class Model(Generic[T]):
     def _load(cls, data, context):
         raise NotImplementedError
 
+    def _load_record(self, data, context):
+        return self._load(data, context)
+
     @classmethod
     def _construct(cls):
         raise NotImplementedError
@@ -79,6 +338,12 @@ class Model(Generic[T]):
     def _fieldhook(cls, f):
         return f
 
+    def _submodels(self):
+        return ()
+
+    def _warmup(self):
+        pass
+
 
 class ModelFeature(Model):
     """Typically links to Subconstruct subclasses"""
@@ -107,6 +372,8 @@ class ModelFeature(Model):
 
     def __class_getitem__(cls, initlist):
         # for nicer annotation syntax :3
+        if not isinstance(initlist, tuple):
+            initlist = (initlist,)
         return cls(*initlist)
 
     def _get_construct_factory(self):
@@ -121,7 +388,14 @@ class ModelFeature(Model):
     def _load(self, data, context):
         loaded = self.model._load(data, context)
         if isinstance(loaded, (bytes, bytearray)):
-            return self._init(self._construct().parse(loaded, **(context or {})), context)
+            construct = _current_construct(self)
+            return self._init(construct.parse(loaded, **(context or {})), context)
+        return self._loader(loaded, context) if self._pass_context else self._loader(loaded)
+
+    def _load_record(self, data, context):
+        if isinstance(data, (bytes, bytearray)):
+            data = _current_construct(self).parse(data, **(context or {}))
+        loaded = self.model._load_record(data, context)
         return self._loader(loaded, context) if self._pass_context else self._loader(loaded)
 
     def _init(self, obj, context=None):
@@ -130,8 +404,15 @@ class ModelFeature(Model):
     def _construct(self):
         return self._get_construct()
 
+    def _trusted_construct(self):
+        """Return the construct without validators, constant and checksum checks."""
+        return _strip_checks(self._construct())
+
+    def _submodels(self):
+        return () if self.model is None else (self.model,)
+
     def _dump(self, obj, **context):
-        return self._construct().build(obj, **context)
+        return _current_construct(self).build(obj, **context)
 
 
 class Singleton(Model):
@@ -268,17 +549,23 @@ class AnnotationManager:
         self._globals = {}
         self._locals = {}
         self._annotations = anns
+        self._lock = threading.RLock()
 
     def get_env(self, stack_offset=None):
-        global_ns, local_ns = self._globals, self._locals
-        if stack_offset is not None:
-            frame = inspect.stack()[stack_offset].frame
-            global_ns.update(frame.f_globals)
-            local_ns.update(frame.f_locals)
-        return global_ns, local_ns
+        with self._lock:
+            global_ns, local_ns = self._globals, self._locals
+            if stack_offset is not None:
+                frame = inspect.stack()[stack_offset].frame
+                global_ns.update(frame.f_globals)
+                local_ns.update(frame.f_locals)
+            return global_ns, local_ns
 
     def map_to_fields(self, stack_offset=1):
-        global_ns, local_ns = self.get_env(stack_offset+1)
+        with self._lock:
+            return self._map_to_fields(stack_offset + 1)
+
+    def _map_to_fields(self, stack_offset):
+        global_ns, local_ns = self.get_env(stack_offset + 1)
         for name, type_hint in typing.get_type_hints(
                 self._mock_object,
                 globalns=global_ns,
@@ -294,6 +581,16 @@ class AnnotationManager:
         return self._annotations
 
     def get_field(self, name, default=MISSING, instance=None):
+        if instance is None:
+            namespace = vars(self.model_dataclass)
+            if name in namespace.get('__slots__', ()):
+                # defaults of slotted fields are moved away from the class namespace
+                slot_defaults = namespace['_slot_defaults']
+                if name in slot_defaults:
+                    return slot_defaults[name]
+                if default is MISSING:
+                    raise AttributeError(name)
+                return default
         target = instance or self.model_dataclass
         return (
             getattr(target, name)
@@ -316,10 +613,424 @@ class AnnotationManager:
             self.model_dataclass.__annotations__ = old
 
 
+def storage(obj):
+    """Convert a (possibly nested) model instance into what its construct builds from."""
+    # duck-typed, since set_endianness() reloads this module
+    get_storage = getattr(obj, '_get_storage', None)
+    if get_storage is not None:
+        return get_storage()
+    if isinstance(obj, (list, tuple)):
+        return [storage(value) for value in obj]
+    if isinstance(obj, dict):
+        return {key: storage(value) for key, value in obj.items()}
+    return obj
+
+
+class _Sourced(_lib.Subconstruct):
+    """
+    Like construct.RawCopy, but refers to the parsed bytes instead of copying them.
+
+    Parses into a Container(value=..., source=...) and builds the source verbatim
+    if it is not None and the build was given no context, or the value otherwise.
+    When parsing from bytes, the source is a memoryview of the parsed buffer,
+    so the whole buffer stays alive as long as any instance loaded from it
+    retains its source.
+    """
+
+    def _parse(self, stream, context, path):
+        start = _lib.stream_tell(stream, path)
+        value = self.subcon._parsereport(stream, context, path)
+        end = _lib.stream_tell(stream, path)
+        if isinstance(stream, io.BytesIO):
+            # getvalue() shares the parsed bytes object instead of copying it
+            source = memoryview(stream.getvalue())[start:end]
+        else:
+            _lib.stream_seek(stream, start, 0, path)
+            source = _lib.stream_read(stream, end - start, path)
+        return _lib.Container(value=value, source=source)
+
+    def _build(self, obj, stream, context, path):
+        source = obj.get('source')
+        if source is not None and not _has_params(context):
+            if stream.write(source) != len(source):
+                raise _lib.StreamError(f'could not write {len(source)} bytes', path=path)
+            return obj
+        self.subcon._build(obj['value'], stream, context, path)
+        return obj
+
+    def _sizeof(self, context, path):
+        return self.subcon._sizeof(context, path)
+
+
+def _has_params(context):
+    """Return whether a build was given context keyword arguments, which may change it."""
+    return any(not key.startswith('_') for key in context._params)
+
+
+def _track_assignment(self, name, value):
+    object.__setattr__(self, name, value)
+    if name in self.__dataclass_fields__:
+        dirty = getattr(self, '_dirty', None)
+        if dirty is None:
+            object.__setattr__(self, '_source', None)
+        else:
+            dirty.add(name)
+
+
+def _bound_eq(self, other):
+    model = type(self).__base__
+    if not isinstance(other, model):
+        return NotImplemented
+    return all(
+        getattr(self, f.name) == getattr(other, f.name) for f in dataclasses.fields(model)
+    )
+
+
+def _model_name(model):
+    return getattr(model, '__name__', type(model).__name__)
+
+
+def _parsing_context(contextkw):
+    context = _lib.Container(**contextkw)
+    context._parsing = True
+    context._building = False
+    context._sizing = False
+    context._params = context
+    return context
+
+
+def _repeated_subcon(model, construct):
+    if isinstance(construct, _lib.Compiled):
+        construct = construct.defersubcon
+    if not isinstance(construct, (_lib.GreedyRange, _lib.RepeatUntil)):
+        raise TypeError(f'{_model_name(model)} is not a GreedyRange or RepeatUntil')
+    return construct
+
+
+def _predicate(construct):
+    predicate = construct.predicate
+    return predicate if callable(predicate) else lambda *_: predicate
+
+
+def _iter_elements(model, construct, stream, contextkw, loader):
+    construct = _repeated_subcon(model, construct)
+    seekable = stream.seekable()
+    if not seekable:
+        stream = _CountingReader(stream)
+    context = _parsing_context(contextkw)
+    context._io = stream
+    subcon, path = construct.subcon, '(iterating)'
+    greedy = isinstance(construct, _lib.GreedyRange)
+    predicate = None if greedy else _predicate(construct)
+    discarded = _lib.ListContainer()
+    for index in itertools.count():
+        context._index = index
+        fallback = stream.tell()
+        try:
+            parsed = subcon._parsereport(stream, context, path)
+        except _lib.StopFieldError:
+            if greedy:
+                return
+            raise
+        except _lib.ExplicitError:
+            raise
+        except Exception:
+            if not greedy:
+                raise
+            # like GreedyRange, stop at the first element that fails to parse
+            if seekable:
+                stream.seek(fallback)
+            return
+        stop = not greedy and predicate(parsed, discarded, context)
+        yield parsed if loader is None else loader(parsed, contextkw)
+        if stop:
+            return
+
+
+def _dump_elements(model, construct, stream, iterable, contextkw, initializer):
+    construct = _repeated_subcon(model, construct)
+    context = _lib.Container(**contextkw)
+    context._parsing = False
+    context._building = True
+    context._sizing = False
+    context._params = context
+    context._io = stream
+    subcon, path = construct.subcon, '(iterating)'
+    predicate = None if isinstance(construct, _lib.GreedyRange) else _predicate(construct)
+    discarded = _lib.ListContainer()
+    count = 0
+    for count, obj in enumerate(iterable, 1):
+        context._index = count - 1
+        if initializer is not None:
+            obj = initializer(obj, contextkw)
+        subcon._build(storage(obj), stream, context, path)
+        # the predicate sees model instances, whose fields are attributes like parsed Containers'
+        if predicate is not None and predicate(obj, discarded, context):
+            return count
+    if predicate is not None:
+        raise _lib.RepeatError('expected any item to match predicate, when building', path=path)
+    return count
+
+
+class _BufferStream(io.RawIOBase):
+    """Read-only stream over a bytes-like object that can be searched without copying."""
+
+    def __init__(self, buffer, offset=0):
+        self._buffer = buffer
+        self._view = memoryview(buffer).cast('B')
+        self._position = offset
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = offset
+        return offset
+
+    def read(self, size=-1):
+        start = self._position
+        end = len(self._view) if size is None or size < 0 else start + size
+        data = bytes(self._view[start:end])
+        self._position = start + len(data)
+        return data
+
+    def find(self, sub, start):
+        find = getattr(self._buffer, 'find', None)
+        if find is None:
+            return bytes(self._view).find(sub, start)
+        return find(sub, start)
+
+
+class _CountingReader(io.RawIOBase):
+    """Non-seekable stream wrapper that can tell how much was read from it."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self._position += len(data)
+        return data
+
+
+def _check_skipped(stream, model):
+    position = stream.tell()
+    if stream.seek(0, io.SEEK_END) < position:
+        raise _lib.StreamError(f'stream ended inside {_model_name(model)}')
+    stream.seek(position)
+
+
+def _advance(stream, size, path):
+    if size < 0:
+        raise _lib.StreamError(f'cannot skip {size} bytes', path=path)
+    if stream.seekable():
+        stream.seek(size, io.SEEK_CUR)
+        return
+    while size > 0:
+        data = stream.read(min(size, 64 * 1024))
+        if not data:
+            raise _lib.StreamError(f'stream ended {size} bytes too early', path=path)
+        size -= len(data)
+
+
+def _static_size(construct, context, path):
+    try:
+        return construct._sizeof(context, path)
+    except (_lib.SizeofError, KeyError, AttributeError, TypeError):
+        return None
+
+
+def _find_terminator(stream, term, start):
+    unit = len(term)
+    if isinstance(stream, io.BytesIO):
+        data = stream.getvalue()
+    elif isinstance(stream, _BufferStream):
+        data = stream
+    else:
+        return None
+    index = data.find(term, start)
+    while index != -1 and (index - start) % unit:
+        index = data.find(term, index + 1)
+    return index
+
+
+_SKIP_PARSED_SIZE = 8  # fields up to this size are parsed so that the context stays usable
+# adapters are not skipped through, the context must hold their decoded values
+_SKIP_THROUGH = (_lib.Renamed, _lib.Const, _lib.Default, _lib.Rebuild, _Sourced)
+
+
+def _skip_fields(construct, stream, context, path, parsed=()):
+    context = _lib.Container(
+        _=context, _params=context._params, _root=None,
+        _parsing=True, _building=False, _sizing=False,
+        _subcons=construct._subcons, _io=stream, _index=context.get('_index', None)
+    )
+    context._root = context._.get('_root', context)
+    values = _lib.Container()
+    for subcon in construct.subcons:
+        if subcon.name in parsed:
+            values[subcon.name] = context[subcon.name] = subcon._parsereport(stream, context, path)
+            continue
+        size = _static_size(subcon, context, path)
+        if size is None or (subcon.name and size <= _SKIP_PARSED_SIZE):
+            try:
+                value = _skip(subcon, stream, context, path)
+            except _lib.StopFieldError:
+                break
+            if subcon.name:
+                values[subcon.name] = context[subcon.name] = value
+        else:
+            _advance(stream, size, path)
+    return values
+
+
+def _skip(construct, stream, context, path):
+    """Advance past a construct, return its parsed value if it was cheaper to parse it."""
+    if isinstance(construct, _lib.Compiled):
+        construct = construct.defersubcon
+    if isinstance(construct, _SKIP_THROUGH):
+        return _skip(construct.subcon, stream, context, path)
+    if isinstance(construct, _lib.FocusedSeq):
+        values = _skip_fields(construct, stream, context, path)
+        return values.get(_lib.evaluate(construct.parsebuildfrom, context))
+    if isinstance(construct, (_lib.Struct, _lib.Sequence)):
+        # partially parsed, so that later fields can still refer to nested scalars
+        return _skip_fields(construct, stream, context, path)
+    if isinstance(construct, _lib.Prefixed):
+        length = construct.lengthfield._parsereport(stream, context, path)
+        if construct.includelength:
+            length -= construct.lengthfield._sizeof(context, path)
+        _advance(stream, length, path)
+        return None
+    if isinstance(construct, _lib.Array):
+        count = _lib.evaluate(construct.count, context)
+        size = _static_size(construct.subcon, context, path)
+        if size is not None:
+            _advance(stream, count * size, path)
+            return None
+        for index in range(count):
+            context._index = index
+            _skip(construct.subcon, stream, context, path)
+        return None
+    if isinstance(construct, _lib.NullTerminated):
+        start = _lib.stream_tell(stream, path)
+        index = _find_terminator(stream, construct.term, start)
+        if index is not None:
+            if index == -1:
+                if construct.require:
+                    raise _lib.StreamError('terminator not found', path=path)
+                stream.seek(0, io.SEEK_END)
+            else:
+                consumed = len(construct.term) if construct.consume else 0
+                stream.seek(index + consumed)
+            return None
+    if construct is _lib.GreedyBytes and stream.seekable():
+        stream.seek(0, io.SEEK_END)
+        return None
+    size = _static_size(construct, context, path)
+    if size is not None and size > _SKIP_PARSED_SIZE:
+        _advance(stream, size, path)
+        return None
+    return construct._parsereport(stream, context, path)
+
+
+class _TrustedConst(_lib.Subconstruct):
+    """Like construct.Const, but skips over the constant instead of parsing and comparing it."""
+
+    def __init__(self, subcon, value):
+        super().__init__(subcon)
+        self.value = value
+
+    def _parse(self, stream, context, path):
+        size = _static_size(self.subcon, context, path)
+        if size is None:
+            self.subcon._parsereport(stream, context, path)
+        else:
+            _advance(stream, size, path)
+        return self.value
+
+    def _build(self, obj, stream, context, path):
+        self.subcon._build(self.value, stream, context, path)
+        return self.value
+
+    def _sizeof(self, context, path):
+        return self.subcon._sizeof(context, path)
+
+
+def _strip_checks(construct, memo=None):
+    """Return a copy of a construct tree without validators, Check, Const and checksum checks."""
+    if memo is None:
+        memo = {}
+    key = id(construct)
+    if key in memo:
+        return memo[key]
+    if isinstance(construct, _lib.Compiled):
+        stripped = _strip_checks(construct.defersubcon, memo)
+        result = construct if stripped is construct.defersubcon else (
+            compiler.compile_construct(stripped)
+        )
+    elif isinstance(construct, _lib.Validator):
+        result = _strip_checks(construct.subcon, memo)
+    elif isinstance(construct, _lib.Check):
+        result = _lib.Pass
+    elif isinstance(construct, _lib.Const):
+        result = _TrustedConst(_strip_checks(construct.subcon, memo), construct.value)
+    else:
+        # constructs of bitbin's own may provide their unchecked variant
+        # (looked up on the type, since some constructs delegate attributes to their subcons)
+        trusted_copy = getattr(type(construct), '_trusted_copy', None)
+        result = trusted_copy(construct) if trusted_copy is not None else construct
+        replaced = {}
+        for path, child in compiler._children(result):
+            stripped = _strip_checks(child, memo)
+            if stripped is not child:
+                replaced.setdefault(path[0], {})[path[1:]] = stripped
+        if replaced and result is construct:
+            result = copy.copy(construct)
+        for attr, items in replaced.items():
+            if () in items:
+                setattr(result, attr, items[()])
+                continue
+            value = getattr(result, attr)
+            if isinstance(value, dict):
+                value = type(value)(value)
+                for (item_key,), stripped in items.items():
+                    value[item_key] = stripped
+            else:
+                value = type(value)(
+                    items.get((index,), item) for index, item in enumerate(value)
+                )
+            setattr(result, attr, value)
+    memo[key] = result
+    return result
+
+
 class StorageBasedModel(Model):
+    __slots__ = ()
+
     _impl = None
     _cache = None
+    _trusted_cache = None
     _storage_based = True
+    _source = None
+    _dirty = None
 
     @classmethod
     def _load(cls, pkt, context):
@@ -328,6 +1039,10 @@ class StorageBasedModel(Model):
             data = cls._parse(pkt, context)
         return cls._load_from_container(data, context)
 
+    @classmethod
+    def _load_record(cls, data, context):
+        return cls._load(data, context)
+
     @classmethod
     def _load_from_container(cls, data, context):
         raise NotImplementedError
@@ -342,51 +1057,145 @@ class StorageBasedModel(Model):
 
     @classmethod
     def _parse(cls, data, context):
-        cs = cls._construct()
+        cs = cls._trusted_construct() if is_trusted() else cls._construct()
         return cs.parse(data, **context)
 
     @classmethod
     def _purge(cls):
         cls._cache = None
+        cls._trusted_cache = None
 
     @classmethod
     def _construct(cls):
         raise NotImplementedError
 
+    @classmethod
+    def _trusted_construct(cls):
+        """Return the construct without validators, constant and checksum checks."""
+        trusted = vars(cls).get('_trusted_cache')
+        if trusted is None:
+            with _cache_lock:
+                trusted = vars(cls).get('_trusted_cache')
+                if trusted is None:
+                    trusted = _strip_checks(cls._construct())
+                    cls._trusted_cache = trusted
+        return trusted
+
+    @classmethod
+    def _warmup(cls):
+        cls._construct()
+        if config.TRUSTED:
+            cls._trusted_construct()
+
     def _get_storage(self):
         raise NotImplementedError
 
+    def _flush(self):
+        raise NotImplementedError
+
+    def _current_source(self):
+        return getattr(self, '_source', None)
+
     def _dump(self, **context):
+        source = self._current_source()
+        if source is not None and not context:
+            if getattr(self, '_dirty', None):
+                self._flush()
+            return bytes(source)
         data = self._get_storage()
-        cs = self._construct()
+        cs = self._trusted_construct() if is_trusted() else self._construct()
         return cs.build(data, **context)
 
 
-class ModelDataclass(StorageBasedModel):
+class _ModelDataclassMeta(type):
+    def __new__(mcs, name, bases, namespace, slots=None, **kwargs):
+        if slots is None:
+            params = namespace.get('_dataclass_params')
+            if params is None:
+                params = next(
+                    (base._dataclass_params for base in bases
+                     if hasattr(base, '_dataclass_params')),
+                    {}
+                )
+            slots = params.get('slots', False) or any(
+                getattr(base, '_slots', False) for base in bases
+            )
+        namespace['_slots'] = slots
+        if kwargs.get('_bitbin'):
+            # bitbin's own bases must not add an instance __dict__ to slotted models
+            namespace.setdefault('__slots__', ())
+        elif slots:
+            inherited = {
+                slot
+                for base in bases for klass in base.__mro__
+                for slot in vars(klass).get('__slots__', ())
+            }
+            new_slots = [
+                slot for slot in (*namespace.get('__annotations__', {}), '_source', '_dirty')
+                if slot not in inherited
+            ]
+            namespace['_slot_defaults'] = {
+                slot: namespace.pop(slot) for slot in new_slots if slot in namespace
+            }
+            namespace['__slots__'] = tuple(new_slots)
+        if not kwargs.get('_bitbin') and any(isinstance(base, mcs) for base in bases):
+            # this frame sits between the class body and __init_subclass__()
+            kwargs['stack_offset'] = kwargs.get('stack_offset', 1) + 1
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+
+class ModelDataclass(StorageBasedModel, metaclass=_ModelDataclassMeta):
+    __slots__ = ()
+
     _annotations = None
     _annotation_mgr = None
     _impl = None
     _cache = None
+    _compiled = False
+    _retain_source = False
+    _layout_cache = None
+    _record_cache = None
+    _bound_cache = None
     _dataclass_params = {}
 
     def __init_subclass__(
             cls,
             _bitbin=False,
             stack_offset=1,
-            annotation_mgr=None
+            annotation_mgr=None,
+            compiled=None,
+            retain_source=None,
     ):
         # never inherit cache
         cls._cache = None
+        cls._layout_cache = None
+        cls._record_cache = None
+        if compiled is not None:
+            cls._compiled = compiled
+        if retain_source is not None:
+            cls._retain_source = retain_source
+            # direct field assignments are tracked, and so are assignments to nested
+            # instances that retain their source too, other in-place mutation is not
+            cls.__setattr__ = _track_assignment if retain_source else object.__setattr__
         if _bitbin:
             return
-        if cls._annotation_mgr is None:
-            if annotation_mgr is None:
-                annotation_mgr = AnnotationManager(cls)
-            cls._annotation_mgr = annotation_mgr
+        _register(cls)
+        if annotation_mgr is None:
+            # the parent model's manager must not be reused
+            annotation_mgr = vars(cls).get('_annotation_mgr') or AnnotationManager(cls)
+        cls._annotation_mgr = annotation_mgr
+        namespace = vars(cls)
+        slot_descriptors = {
+            name: namespace[name] for name in namespace.get('__slots__', ()) if name in namespace
+        }
+        dataclass_params = {k: v for k, v in cls._dataclass_params.items() if k != 'slots'}
         # some hacking
         with annotation_mgr.replace_annotations(stack_offset + 1):
             # there we go
-            dataclasses.dataclass(cls, **cls._dataclass_params)
+            dataclasses.dataclass(cls, **dataclass_params)
+        # dataclass() replaces class attributes with field defaults
+        for name, descriptor in slot_descriptors.items():
+            setattr(cls, name, descriptor)
 
     def __post_init__(self):
         missing_cookie = object()
@@ -397,10 +1206,13 @@ class ModelDataclass(StorageBasedModel):
             orig = self._annotation_mgr.get_field(name, default=missing_cookie, instance=self)
             if orig is missing_cookie:
                 continue
-            value = model._init(orig, context)
+            value = self._init_field(name, model, orig, context)
             self._annotation_mgr.set_field(name, value, instance=self)
             context[name] = value
 
+    def _init_field(self, name, model, value, context):
+        return model._init(value, context)
+
     @classmethod
     def _init(cls, obj, context=None):
         if isinstance(obj, (cls, LazyStorageBased)):
@@ -415,6 +1227,15 @@ class ModelDataclass(StorageBasedModel):
 
     @classmethod
     def _load_from_container(cls, data, context):
+        if cls._retain_source:
+            instance = cls._load_from_value(data.value, context)
+            if isinstance(instance, cls):
+                object.__setattr__(instance, '_source', data.source)
+            return instance
+        return cls._load_from_value(data, context)
+
+    @classmethod
+    def _load_from_value(cls, data, context):
         if isinstance(data, _lib.Container):
             return cls._eager_load(data, context)
         if isinstance(data, _lib.LazyContainer):
@@ -426,26 +1247,217 @@ class ModelDataclass(StorageBasedModel):
         initdict = {}
         for f in dataclasses.fields(cls):
             name, model = f.name, f.metadata['model']
-            init = model._load(data[name], context)
+            init = cls._load_field(name, model, data[name], context)
             initdict[name] = init
             context[name] = init
+        return cls._from_loaded(initdict)
+
+    @classmethod
+    def _load_field(cls, name, model, data, context):
+        return model._load(data, context)
+
+    @classmethod
+    def _from_loaded(cls, initdict):
+        if is_trusted():
+            # loaded values are already of the right types
+            instance = cls.__new__(cls)
+            for name, value in initdict.items():
+                object.__setattr__(instance, name, value)
+            return instance
         return cls._init(initdict)
 
+    @classmethod
+    def _load_record(cls, data, context):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = cls._parse(data, context)
+        if cls._retain_source:
+            data = data.value
+        values = []
+        for f in dataclasses.fields(cls):
+            name, model = f.name, f.metadata['model']
+            value = model._load_record(data[name], context)
+            values.append(value)
+            context[name] = value
+        return tuple.__new__(cls._record_type(), values)
+
+    @classmethod
+    def _record_type(cls):
+        record = vars(cls).get('_record_cache')
+        if record is not None:
+            return record
+        with _cache_lock:
+            record = vars(cls).get('_record_cache')
+            if record is not None:
+                return record
+            names = [f.name for f in dataclasses.fields(cls)]
+            record = type(f'{cls.__name__}Record', (_collections.namedtuple(
+                f'{cls.__name__}Record', names, module=cls.__module__
+            ),), {
+                '__slots__': (),
+                '__module__': cls.__module__,
+                '_model': cls,
+                '_get_storage': _record_storage,
+                '_dump': _record_dump,
+            })
+            cls._record_cache = record
+            return record
+
+    @classmethod
+    def _bound_type(cls):
+        """Return the subclass of bind() instances, the only one that tracks assignments."""
+        bound = vars(cls).get('_bound_cache')
+        if bound is not None:
+            return bound
+        with _cache_lock:
+            bound = vars(cls).get('_bound_cache')
+            if bound is not None:
+                return bound
+            namespace = {
+                '__module__': cls.__module__,
+                '__qualname__': cls.__qualname__,
+                '__setattr__': _track_assignment,
+                '_bound_model': cls,
+            }
+            if cls.__dataclass_params__.eq:
+                namespace['__eq__'] = _bound_eq
+                namespace['__hash__'] = cls.__hash__
+            bound = type(cls)(cls.__name__, (cls,), namespace, _bitbin=True)
+            # share the caches of the model rather than building them again
+            del bound._cache, bound._layout_cache, bound._record_cache
+            cls._bound_cache = bound
+            return bound
+
     @classmethod
     def _construct(cls):
         if cls._cache:
             return cls._cache
-        initdict = {}
+        with _cache_lock:
+            if cls._cache:
+                return cls._cache
+            initdict = {}
+            for f in dataclasses.fields(cls):
+                name, model = f.name, f.metadata['model']
+                construct = model._construct()
+                initdict[name] = construct
+            impl = cls._impl(**initdict)
+            if cls._retain_source:
+                impl = _Sourced(impl)
+            if cls._compiled:
+                impl = compiler.compile_construct(impl)
+            # published only once complete
+            cls._cache = impl
+            return impl
+
+    def __reduce__(self):
+        # retained sources and bound buffers are left out, bound instances pickle as plain ones
+        model = vars(type(self)).get('_bound_model', type(self))
+        state = {
+            name: value for name, value in getattr(self, '__dict__', {}).items()
+            if name not in ('_source', '_dirty')
+        }
+        state.update((f.name, getattr(self, f.name)) for f in dataclasses.fields(self))
+        return _restore, (model, state)
+
+    @classmethod
+    def _submodels(cls):
+        return [f.metadata['model'] for f in dataclasses.fields(cls)]
+
+    @classmethod
+    def _warmup(cls):
+        super()._warmup()
+        cls._layout()
+
+    @classmethod
+    def _purge(cls):
+        super()._purge()
+        cls._layout_cache = None
+
+    @classmethod
+    def _layout(cls):
+        """Return (name, offset, size, construct) of every field if the layout is fixed."""
+        if cls._layout_cache is None:
+            with _cache_lock:
+                if cls._layout_cache is None:
+                    cls._layout_cache = cls._compute_layout() or False
+        return cls._layout_cache or None
+
+    @classmethod
+    def _compute_layout(cls):
+        layout = []
+        offset = 0
+        if cls._impl is not _lib.Struct:
+            return None
         for f in dataclasses.fields(cls):
-            name, model = f.name, f.metadata['model']
-            construct = model._construct()
-            initdict[name] = construct
-        impl = cls._impl(**initdict)
-        cls._cache = impl  # .compile()
-        return impl
+            construct = f.metadata['model']._construct()
+            try:
+                size = construct.sizeof()
+            except (_lib.SizeofError, KeyError, AttributeError):
+                return None
+            layout.append((f.name, offset, size, construct))
+            offset += size
+        return layout
+
+    def _flush(self):
+        dirty = getattr(self, '_dirty', None)
+        if not dirty:
+            return 0
+        source = self._source
+        for name, offset, size, construct in self._layout():
+            if name in dirty:
+                data = construct.build(storage(getattr(self, name)))
+                if len(data) != size:
+                    raise _lib.SizeofError(
+                        f'field {name!r} built into {len(data)} bytes, expected {size}'
+                    )
+                source[offset:offset + size] = data
+        count = len(dirty)
+        dirty.clear()
+        return count
 
     def _get_storage(self):
-        return dataclasses.asdict(self)
+        if getattr(self, '_dirty', None):
+            self._flush()
+        data = {f.name: storage(getattr(self, f.name)) for f in dataclasses.fields(self)}
+        if self._retain_source:
+            return {'value': data, 'source': self._current_source()}
+        return data
+
+    def _current_source(self):
+        """Return the retained source, unless this instance or one nested in it changed."""
+        source = getattr(self, '_source', None)
+        if source is None or getattr(self, '_dirty', None) is not None:
+            return source
+        for f in dataclasses.fields(self):
+            if not _source_intact(getattr(self, f.name)):
+                object.__setattr__(self, '_source', None)
+                return None
+        return source
+
+
+def _restore(model, state):
+    instance = model.__new__(model)
+    for name, value in state.items():
+        object.__setattr__(instance, name, value)
+    return instance
+
+
+def _source_intact(value):
+    if isinstance(value, (list, tuple)) and not hasattr(value, '_fields'):
+        return all(map(_source_intact, value))
+    if getattr(value, '_retain_source', False) and not isinstance(value, type):
+        return value._current_source() is not None
+    return True
+
+
+def _record_storage(self):
+    data = {name: storage(value) for name, value in zip(self._fields, self)}
+    if self._model._retain_source:
+        return {'value': data, 'source': None}
+    return data
+
+
+def _record_dump(self, **context):
+    return _current_construct(self._model).build(self._get_storage(), **context)
 
 
 def models(cls):
@@ -468,7 +1480,7 @@ class LazyStorageBased:
         return self.__object
 
     def __getattr__(self, item):
-        return getattr(self, self(), item)
+        return getattr(self(), item)
 
     def __eq__(self, other):
         return self() == other
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import functools
+import io
+import sys
 from typing import Callable
 
 import construct as _lib
+from construct.core import encodingunit
 
 from bitbin import config
 from bitbin import core
@@ -68,6 +72,8 @@ __all__ = (
 
     'int_type',
     'bitwise_int_type',
+    'interned_str',
+    'interned_string_type',
 )
 
 Bool = Flag = core.Atomic(_lib.Flag, bool)
@@ -82,8 +88,7 @@ def bitwise_int_type(
         endianness=config.ENDIANNESS
 ):
     swapped = endianness == config.Endianness.LITTLE
-    return core.Atomic(_lib.BitsInteger(bit_length), signed=signed, swapped=swapped)
-
+    return core.Atomic(_lib.BitsInteger(bit_length, signed=signed, swapped=swapped), int)
 
 
 Int8sl = core.Atomic(_lib.Int8sl, int)
@@ -183,6 +188,54 @@ else:
     double = Float64l
 
 
+class _InternedString(_lib.Adapter):
+    """CString that decodes through a bounded cache of interned strings."""
+
+    def __init__(self, encoding, maxsize):
+        super().__init__(_lib.NullTerminated(_lib.GreedyBytes, term=encodingunit(encoding)))
+        self.encoding = encoding
+        self.maxsize = maxsize
+        self._term = encodingunit(encoding)
+        self._decode_bytes = functools.lru_cache(maxsize)(self._intern)
+
+    def _intern(self, data):
+        return sys.intern(data.decode(self.encoding))
+
+    def _parse(self, stream, context, path):
+        if not isinstance(stream, io.BytesIO):
+            return super()._parse(stream, context, path)
+        # getvalue() shares the parsed bytes object, so we can find() the terminator
+        buffer = stream.getvalue()
+        start = stream.tell()
+        term, unit = self._term, len(self._term)
+        end = buffer.find(term, start)
+        while end != -1 and (end - start) % unit:
+            end = buffer.find(term, end + 1)
+        if end == -1:
+            raise _lib.StreamError('could not find the string terminator', path=path)
+        stream.seek(end + unit)
+        return self._decode_bytes(buffer[start:end])
+
+    def _decode(self, obj, context, path):
+        return self._decode_bytes(obj)
+
+    def _encode(self, obj, context, path):
+        return obj.encode(self.encoding)
+
+
+def interned_string_type(encoding=config.DEFAULT_ENCODING, maxsize=4096):
+    """
+    Null-terminated string whose decoded values are interned and cached by their raw bytes.
+
+    Worth it for fields with few distinct values repeated many times,
+    such as symbols, hostnames or enum-like tags.
+    """
+    return core.Atomic(_InternedString(encoding, maxsize), str)
+
+
+interned_str = interned_string_type()
+
+
 atomic_types = util.atomic_types
 atomic_types.register(int, core.Atomic(_lib.Int32sb, int))
 atomic_types.register(float, core.Atomic(_lib.Float32b, float))
@@ -1,9 +1,16 @@
+import array
 import dataclasses
+import datetime
+import functools
+import io
+import operator
+import struct
 from typing import Callable, Any
 
 import construct as _lib
 
 from bitbin import core
+from bitbin import records
 
 __all__ = (
     'Aligned',
@@ -53,7 +60,8 @@ __all__ = (
 
 class _ModelFeatureDataclass(core.ModelFeature):
     def _extract_args(self):
-        args = dataclasses.asdict(self)
+        # not dataclasses.asdict(), which deep-copies (and so evaluates) this-expressions
+        args = {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}
         del args['model']
         return args
 
@@ -73,44 +81,386 @@ class Aligned(_ModelFeatureDataclass):
     _feature_impl = _lib.Aligned  # (modulus, subcon, pattern=b'\x00')
 
 
+class _ListFeature(_ModelFeatureDataclass):
+    _storage_based = True
+
+    def _extract_args(self):
+        args = super()._extract_args()
+        del args['type']
+        return args
+
+    def _batch_adapter(self):
+        batch_adapter = getattr(self.model, '_batch_adapter', None)
+        return batch_adapter and batch_adapter()
+
+    def _get_construct(self, subcon=None):
+        batch_adapter = self._batch_adapter()
+        if subcon is None and batch_adapter is not None:
+            # elements are parsed unadapted and the whole list is adapted at once
+            return batch_adapter(super()._get_construct(self.model.model._construct()))
+        return super()._get_construct(subcon)
+
+    def _init(self, obj, context=None):
+        if self._batch_adapter() is not None:
+            return obj
+        return self.type(map(self.model._init, obj))
+
+    def _load(self, data, context):
+        if isinstance(data, (bytes, bytearray)):
+            data = core._current_construct(self).parse(data, **(context or {}))
+        if self._batch_adapter() is not None:
+            # whatever the batch decoder returned, e.g. a NumPy array
+            return data
+        return self.type(self.model._load(element, context) for element in data)
+
+    def _load_record(self, data, context):
+        if isinstance(data, (bytes, bytearray)):
+            data = core._current_construct(self).parse(data, **(context or {}))
+        if self._batch_adapter() is not None:
+            return tuple(data)
+        return tuple(self.model._load_record(element, context) for element in data)
+
+    def _iter_load(self, stream, context):
+        # elements are adapted one by one, even if there is a batch adapter
+        construct = self._get_construct(core._current_construct(self.model))
+        return core._iter_elements(self, construct, stream, context, self.model._load)
+
+    def _dump_iter(self, stream, iterable, context):
+        construct = self._get_construct(core._current_construct(self.model))
+        return core._dump_elements(self, construct, stream, iterable, context, self.model._init)
+
+
 @dataclasses.dataclass
-class Array(_ModelFeatureDataclass):
+class Array(_ListFeature):
     """Port to construct.Array"""
     count: int | Callable[[], int]
     model: Any  # require model here for no decorator syntax
     discard: bool = False
     type: type = list
 
-    _storage_based = True
     _feature_impl = _lib.Array  # (count, subcon, discard=False)
 
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _ZlibDecompressor:
+    def __init__(self, wbits):
+        import zlib
+        self._impl = zlib.decompressobj(wbits)
+
+    @property
+    def needs_input(self):
+        return not self._impl.unconsumed_tail
+
+    @property
+    def eof(self):
+        return self._impl.eof
+
+    @property
+    def unused_data(self):
+        return self._impl.unused_data
+
+    def decompress(self, data, max_length):
+        return self._impl.decompress(data or self._impl.unconsumed_tail, max_length)
+
+
+class _LZ4Compressor:
+    def __init__(self):
+        import lz4.frame
+        self._impl = lz4.frame.LZ4FrameCompressor()
+        self._header = self._impl.begin()
+
+    def compress(self, data):
+        header, self._header = self._header, b''
+        return header + self._impl.compress(data)
+
+    def flush(self):
+        return self._header + self._impl.flush()
+
+
+def _make_decompressor(encoding):
+    if encoding == 'zlib':
+        import zlib
+        return _ZlibDecompressor(zlib.MAX_WBITS)
+    if encoding == 'gzip':
+        import zlib
+        return _ZlibDecompressor(16 + zlib.MAX_WBITS)
+    if encoding == 'bzip2':
+        import bz2
+        return bz2.BZ2Decompressor()
+    if encoding == 'lzma':
+        import lzma
+        return lzma.LZMADecompressor()
+    if encoding == 'lz4':
+        import lz4.frame
+        return lz4.frame.LZ4FrameDecompressor()
+    raise ValueError(f'streaming is not supported for encoding {encoding!r}')
+
+
+def _make_compressor(encoding, level=None):
+    if encoding in ('zlib', 'gzip'):
+        import zlib
+        wbits = zlib.MAX_WBITS + (16 if encoding == 'gzip' else 0)
+        return zlib.compressobj(-1 if level is None else level, zlib.DEFLATED, wbits)
+    if encoding == 'bzip2':
+        import bz2
+        return bz2.BZ2Compressor(9 if level is None else level)
+    if encoding == 'lzma':
+        import lzma
+        return lzma.LZMACompressor()
+    if encoding == 'lz4':
+        return _LZ4Compressor()
+    raise ValueError(f'streaming is not supported for encoding {encoding!r}')
+
+
+class _DecompressingReader(io.RawIOBase):
+    """
+    Read-only stream of decompressed data pulled lazily from a compressed stream.
+
+    Only the last `window` bytes are retained for seeking back
+    (which is what GreedyRange and friends do when an element fails to parse).
+    """
+
+    def __init__(self, stream, decompressor, chunk_size, window):
+        super().__init__()
+        self._stream = stream
+        self._decompressor = decompressor
+        self._chunk_size = chunk_size
+        self._window = window
+        self._buffer = bytearray()
+        self._start = 0
+        self._pos = 0
+        self._exhausted = False
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def _pull(self):
+        decompressor = self._decompressor
+        data = b''
+        if decompressor.eof:
+            self._exhausted = True
+            return
+        if decompressor.needs_input:
+            data = self._stream.read(self._chunk_size)
+            if not data:
+                self._exhausted = True
+                return
+        self._buffer += decompressor.decompress(data, self._chunk_size)
+
+    def _fill(self, end):
+        while (end is None or self._start + len(self._buffer) < end) and not self._exhausted:
+            self._pull()
+
+    def _trim(self):
+        excess = self._pos - self._start - self._window
+        if excess > self._chunk_size:
+            del self._buffer[:excess]
+            self._start += excess
+
+    def read(self, size=-1):
+        end = None if size is None or size < 0 else self._pos + size
+        self._fill(end)
+        offset = self._pos - self._start
+        data = bytes(self._buffer[offset:None if end is None else end - self._start])
+        self._pos += len(data)
+        self._trim()
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('cannot seek relative to the end of a compressed stream')
+        if offset < self._start:
+            raise io.UnsupportedOperation(
+                f'cannot seek back to {offset}, only {self._window} bytes are retained'
+            )
+        self._fill(offset)
+        self._pos = min(offset, self._start + len(self._buffer))
+        return self._pos
+
+    def unused_data(self):
+        return getattr(self._decompressor, 'unused_data', b'')
+
+    def finish(self, path):
+        """Read to the end of the compressed data and give back what was read past it."""
+        while not self._exhausted:
+            self._pull()
+            self._start += len(self._buffer)
+            self._buffer.clear()
+        unused = len(self.unused_data())
+        if not unused:
+            return
+        if not self._stream.seekable():
+            raise _lib.StreamError(
+                f'read {unused} bytes past the compressed data from a non-seekable stream',
+                path=path
+            )
+        self._stream.seek(-unused, io.SEEK_CUR)
+
+
+class _CompressingWriter(io.RawIOBase):
+    def __init__(self, stream, compressor, chunk_size):
+        super().__init__()
+        self._stream = stream
+        self._compressor = compressor
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def write(self, data):
+        self._buffer += data
+        self._pos += len(data)
+        if len(self._buffer) >= self._chunk_size:
+            self._stream.write(self._compressor.compress(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def finish(self):
+        if self._buffer:
+            self._stream.write(self._compressor.compress(self._buffer))
+            self._buffer.clear()
+        self._stream.write(self._compressor.flush())
+
+
+class _StreamCompressed(_lib.Subconstruct):
+    """
+    Like construct.Compressed, but parses the subcon straight from the decompressor
+    and builds it straight into the compressor, holding only bounded buffers.
+    """
+
+    def __init__(self, subcon, encoding, level=None, chunk_size=STREAM_CHUNK_SIZE):
+        super().__init__(subcon)
+        self.encoding = encoding
+        self.level = level
+        self.chunk_size = chunk_size
+
+    def reader(self, stream):
+        return _DecompressingReader(
+            stream, _make_decompressor(self.encoding),
+            self.chunk_size, window=self.chunk_size
+        )
+
+    def writer(self, stream):
+        return _CompressingWriter(
+            stream, _make_compressor(self.encoding, self.level), self.chunk_size
+        )
+
+    def _parse(self, stream, context, path):
+        reader = self.reader(stream)
+        obj = self.subcon._parsereport(reader, context, path)
+        reader.finish(path)
+        return obj
+
+    def _build(self, obj, stream, context, path):
+        writer = self.writer(stream)
+        self.subcon._build(obj, writer, context, path)
+        writer.finish()
+        return obj
+
+    def _sizeof(self, context, path):
+        raise _lib.SizeofError(path=path)
+
+
+class _CompressedFeature(_ModelFeatureDataclass):
     def _extract_args(self):
         args = super()._extract_args()
-        del args['type']
+        del args['streaming'], args['chunk_size']
         return args
 
-    def _init(self, obj, context=None):
-        return self.type(map(self.model._init, obj))
+    def _get_construct_factory(self):
+        if self.streaming:
+            return lambda subcon: _StreamCompressed(
+                subcon, self._encoding(), self._level(), self.chunk_size
+            )
+        return super()._get_construct_factory()
+
+    def _encoding(self):
+        raise NotImplementedError
+
+    def _level(self):
+        return None
 
     def _load(self, data, context):
         if isinstance(data, (bytes, bytearray)):
-            data = self._construct().parse(data, **(context or {}))
-        return self.type(self.model._init(element) for element in data)
+            data = core._current_construct(self).parse(data, **(context or {}))
+        return self.model._load(data, context)
+
+    def _stream_construct(self):
+        if not self.streaming:
+            raise TypeError('only streaming compressed models can be iterated over')
+        return self._construct()
+
+    def _iter_load(self, stream, context):
+        construct = self._stream_construct()
+        reader = construct.reader(stream)
+        yield from core.iter_load(self.model, reader, **context)
+        reader.finish('(iterating)')
+
+    def _dump_iter(self, stream, iterable, context):
+        writer = self._stream_construct().writer(stream)
+        count = core.dump_iter(self.model, writer, iterable, **context)
+        writer.finish()
+        return count
+
+
+@dataclasses.dataclass
+class Compressed(_CompressedFeature):
+    """
+    Port to construct.Compressed
+
+    With streaming=True, the model is parsed directly from the decompressor
+    and built directly into the compressor, holding only bounded buffers
+    of compressed and decompressed data. Loading a GreedyRange or RepeatUntil
+    still collects all its elements; iter_load() and dump_iter() take them
+    one by one. Non-seekable streams must end with the compressed data.
+    """
+    encoding: str
+    model: Any = None
+    level: int | None = None
+    streaming: bool = False
+    chunk_size: int = STREAM_CHUNK_SIZE
 
+    _feature_impl = _lib.Compressed  # (subcon, encoding, level=None)
 
-@dataclasses.dataclass
-class Compressed(_ModelFeatureDataclass):
-    """Port to construct.Compressed"""
+    def _encoding(self):
+        return self.encoding
 
-    _feature_impl = _lib.Compressed  # (subcon, encoding, level=None)
+    def _level(self):
+        return self.level
 
 
 @dataclasses.dataclass
-class CompressedLZ4(_ModelFeatureDataclass):
+class CompressedLZ4(_CompressedFeature):
     """Port to construct.CompressedLZ4"""
+    model: Any = None
+    streaming: bool = False
+    chunk_size: int = STREAM_CHUNK_SIZE
 
     _feature_impl = _lib.CompressedLZ4  # (subcon)
 
+    def _encoding(self):
+        return 'lz4'
+
 
 @dataclasses.dataclass
 class Const(_ModelFeatureDataclass):
@@ -142,31 +492,210 @@ class Default(_ModelFeatureDataclass):
         return super()._init(obj, context)
 
 
+_DENSE_TABLE_LIMIT = 4096  # largest value looked up in a list rather than a dict
+
+
+def _lookup(table, fallback):
+    if isinstance(table, list):
+        size = len(table)
+
+        def decode(value):
+            if 0 <= value < size:
+                member = table[value]
+                if member is not None:
+                    return member
+            return fallback(value)
+    else:
+        get = table.get
+
+        def decode(value):
+            member = get(value)
+            return fallback(value) if member is None else member
+    return decode
+
+
+def _enum_decoder(enum_type):
+    members = {member.value: member for member in enum_type}
+    if members and min(members) >= 0 and max(members) < _DENSE_TABLE_LIMIT:
+        table = [None] * (max(members) + 1)
+        for value, member in members.items():
+            table[value] = member
+        members = table
+    # values without a member are loaded as plain integers, like construct.Enum does
+    return _lookup(members, int)
+
+
+def _flags_decoder(flags_type):
+    mask = functools.reduce(operator.or_, (flag.value for flag in flags_type), 0)
+    if mask < _DENSE_TABLE_LIMIT:
+        return _lookup([flags_type(value) for value in range(mask + 1)], flags_type)
+    return functools.lru_cache(maxsize=_DENSE_TABLE_LIMIT)(flags_type)
+
+
+class _IntEnumFeature(_ModelFeatureDataclass):
+    def __post_init__(self):
+        super().__post_init__()
+        self._decode = self._make_decoder(self.enum)
+
+    def _get_construct_factory(self):
+        # members are decoded by the model, the construct deals with plain integers
+        return lambda subcon: subcon
+
+    def _load(self, data, context):
+        if isinstance(data, (bytes, bytearray)):
+            data = core._current_construct(self).parse(data, **(context or {}))
+        return self._decode(data)
+
+    def _load_record(self, data, context):
+        return self._load(data, context)
+
+    def _init(self, obj, context=None):
+        if isinstance(obj, self.enum):
+            return obj
+        if isinstance(obj, str):
+            return self._from_name(obj)
+        return self._decode(self.model._init(obj))
+
+    def _from_name(self, name):
+        try:
+            return self.enum[name]
+        except KeyError:
+            raise ValueError(f'{name!r} is not a member of {self.enum.__name__}') from None
+
+
 @dataclasses.dataclass
-class Enum(_ModelFeatureDataclass):
-    """Port to construct.Enum"""
+class Enum(_IntEnumFeature):
+    """Port to construct.Enum, loading into members of an enum.IntEnum class"""
+    enum: type
+    model: Any = None
 
     _feature_impl = _lib.Enum  # (subcon, *merge, **mapping)
+    _make_decoder = staticmethod(_enum_decoder)
+
+
+class _BatchAdapter(_lib.Adapter):
+    """
+    Adapts a whole parsed list at once.
+
+    Lists of fixed-width integers reach the decoder as a typed array.array,
+    and an Array of them is unpacked in one go rather than element by element.
+    """
+
+    def __init__(self, subcon, decoder, encoder):
+        super().__init__(subcon)
+        self.decoder = decoder
+        self.encoder = encoder
+        self.fmtstr = _integer_format(subcon.subcon)
+
+    def _parse(self, stream, context, path):
+        if self.fmtstr is None or not isinstance(self.subcon, _lib.Array) or self.subcon.discard:
+            return super()._parse(stream, context, path)
+        count = _lib.evaluate(self.subcon.count, context)
+        if not 0 <= count:
+            raise _lib.RangeError(f'invalid count {count}', path=path)
+        fmt = f'{self.fmtstr[0]}{count}{self.fmtstr[1:]}'
+        values = struct.unpack(fmt, _lib.stream_read(stream, struct.calcsize(fmt), path))
+        return self._decode(values, context, path)
+
+    def _decode(self, obj, context, path):
+        if self.fmtstr is not None and not isinstance(obj, array.array):
+            obj = array.array(records._TYPECODES[self.fmtstr[1:]], obj)
+        return self.decoder(obj, context)
+
+    def _encode(self, obj, context, path):
+        return self.encoder(obj, context)
+
+
+_INTEGER_CODES = frozenset('bBhHiIlLqQ')
+
+
+def _integer_format(construct):
+    if isinstance(construct, _lib.FormatField) and construct.fmtstr[1:] in _INTEGER_CODES:
+        return construct.fmtstr
+    return None
+
+
+def _elementwise(func):
+    return lambda values, context: [func(value, context) for value in values]
+
+
+class _AdapterFeature(_ModelFeatureDataclass):
+    """Values of adapters are decoded by the construct, the model only parses them."""
+
+    def _functions(self):
+        raise NotImplementedError
+
+    def _batch_functions(self):
+        return None, None
+
+    def _get_construct_factory(self):
+        decoder, encoder = self._functions()
+        return lambda subcon: _lib.ExprAdapter(subcon, decoder, encoder)
+
+    def _batch_adapter(self):
+        """Return a factory of the adapter of a whole list of such values, if batching."""
+        return self._batch_adapter_factory
+
+    @functools.cached_property
+    def _batch_adapter_factory(self):
+        batch_decoder, batch_encoder = self._batch_functions()
+        if batch_decoder is None and batch_encoder is None:
+            return None
+        decoder, encoder = self._functions()
+        batch_decoder = batch_decoder or _elementwise(decoder)
+        batch_encoder = batch_encoder or _elementwise(encoder)
+        return lambda subcon: _BatchAdapter(subcon, batch_decoder, batch_encoder)
+
+    def _load(self, data, context):
+        if isinstance(data, (bytes, bytearray)):
+            data = core._current_construct(self).parse(data, **(context or {}))
+        return data
+
+    def _load_record(self, data, context):
+        return self._load(data, context)
+
+    def _init(self, obj, context=None):
+        return obj
 
 
 @dataclasses.dataclass
-class Adapter(_ModelFeatureDataclass):
-    """Port to construct.ExprAdapter"""
+class Adapter(_AdapterFeature):
+    """
+    Port to construct.ExprAdapter
+
+    Inside Array and GreedyRange, batch_decoder and batch_encoder (if given)
+    adapt the list of all the values at once instead of decoder and encoder.
+    """
     decoder: Callable[[Any, _lib.Container], Any]
     encoder: Callable[[Any, _lib.Container], Any]
     model: Any = None
+    batch_decoder: Callable[[Any, _lib.Container], Any] | None = None
+    batch_encoder: Callable[[Any, _lib.Container], Any] | None = None
 
     _feature_impl = _lib.ExprAdapter  # (subcon, decoder, encoder)
 
+    def _functions(self):
+        return self.decoder, self.encoder
+
+    def _batch_functions(self):
+        return self.batch_decoder, self.batch_encoder
+
 
 @dataclasses.dataclass
-class SymmetricAdapter(_ModelFeatureDataclass):
+class SymmetricAdapter(_AdapterFeature):
     """Port to construct.ExprSymmetricAdapter"""
     encoder: Callable[[Any, _lib.Container], Any]
     model: Any = None
+    batch_encoder: Callable[[Any, _lib.Container], Any] | None = None
 
     _feature_impl = _lib.ExprSymmetricAdapter  # (subcon, encoder)
 
+    def _functions(self):
+        return self.encoder, self.encoder
+
+    def _batch_functions(self):
+        return self.batch_encoder, self.batch_encoder
+
 
 @dataclasses.dataclass
 class Validator(_ModelFeatureDataclass):
@@ -187,17 +716,36 @@ class FixedSized(_ModelFeatureDataclass):
 
 
 @dataclasses.dataclass
-class FlagsEnum(_ModelFeatureDataclass):
-    """Port to construct.FlagsEnum"""
+class FlagsEnum(_IntEnumFeature):
+    """Port to construct.FlagsEnum, loading into values of an enum.IntFlag class"""
+    enum: type
+    model: Any = None
 
     _feature_impl = _lib.FlagsEnum  # (subcon, *merge, **flags)
+    _make_decoder = staticmethod(_flags_decoder)
+
+    def _init(self, obj, context=None):
+        if isinstance(obj, dict):
+            # like construct.FlagsEnum containers, {flag name: bool}
+            return functools.reduce(
+                operator.or_,
+                (self._from_name(name) for name, value in obj.items() if value),
+                self.enum(0)
+            )
+        return super()._init(obj, context)
+
+    def _from_name(self, name):
+        return functools.reduce(
+            operator.or_, map(super()._from_name, name.split('|')), self.enum(0)
+        )
 
 
 @dataclasses.dataclass
-class GreedyRange(_ModelFeatureDataclass):
+class GreedyRange(_ListFeature):
     """Port to construct.GreedyRange"""
     model: Any
     discard: bool = False
+    type: type = list
 
     _feature_impl = _lib.GreedyRange  # (subcon, discard=False)
 
@@ -356,8 +904,12 @@ class Renamed(_ModelFeatureDataclass):
 
 
 @dataclasses.dataclass
-class RepeatUntil(_ModelFeatureDataclass):
+class RepeatUntil(_ListFeature):
     """Port to construct.RepeatUntil"""
+    predicate: Callable[[Any, list, _lib.Container], bool]
+    model: Any
+    discard: bool = False
+    type: type = list
 
     _feature_impl = _lib.RepeatUntil  # (predicate, subcon, discard=False)
 
@@ -399,19 +951,45 @@ class StringEncoded(_ModelFeatureDataclass):
     _feature_impl = _lib.StringEncoded  # (subcon, encoding)
 
 
-@dataclasses.dataclass
-class SymmetricAdapter(_ModelFeatureDataclass):
-    """Port to construct.SymmetricAdapter"""
-
-    _feature_impl = _lib.SymmetricAdapter  # (subcon)
+_UNIX_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
 
 
 @dataclasses.dataclass
-class TimestampAdapter(_ModelFeatureDataclass):
-    """Port to construct.TimestampAdapter"""
+class TimestampAdapter(_AdapterFeature):
+    """
+    Port to construct.TimestampAdapter
+
+    Loads numbers of units (in seconds) since the epoch as datetime objects,
+    adapting whole lists at once inside Array and GreedyRange.
+    """
+    model: Any = None
+    unit: float = 1
+    epoch: datetime.datetime = _UNIX_EPOCH
 
     _feature_impl = _lib.TimestampAdapter  # (subcon)
 
+    def _functions(self):
+        epoch, unit = self.epoch, datetime.timedelta(seconds=self.unit)
+        integral = getattr(self.model, '_obj_type', int) is int
+
+        def decoder(value, context):
+            return epoch + value * unit
+
+        def encoder(value, context):
+            units = (value - epoch) / unit
+            return round(units) if integral else units
+
+        return decoder, encoder
+
+    def _batch_functions(self):
+        decoder, encoder = self._functions()
+        epoch, unit = self.epoch, datetime.timedelta(seconds=self.unit)
+
+        def batch_decoder(values, context):
+            return [epoch + value * unit for value in values]
+
+        return batch_decoder, _elementwise(encoder)
+
 
 @dataclasses.dataclass
 class Transformed(_ModelFeatureDataclass):
@@ -1,5 +1,11 @@
+import dataclasses
 import functools
+import hashlib
+import io
+import threading
 import typing
+import zlib
+from typing import Any, Callable
 
 import construct as _lib
 
@@ -29,10 +35,152 @@ class Check(core.Model):
     _impl = _lib.Check  # (func)
 
 
-class Checksum(core.Model):
-    """Port to construct.Checksum"""
+class _ZlibChecksum:
+    def __init__(self, func):
+        self._func = func
+        self._value = func(b'')
 
-    _impl = _lib.Checksum  # (checksumfield, hashfunc, bytesfunc)
+    def update(self, data):
+        self._value = self._func(data, self._value)
+
+    def result(self):
+        return self._value
+
+
+class _HashlibChecksum:
+    def __init__(self, name):
+        self._hash = hashlib.new(name)
+
+    def update(self, data):
+        self._hash.update(data)
+
+    def result(self):
+        return self._hash.digest()
+
+
+class _CallableChecksum:
+    def __init__(self, func):
+        self._func = func
+        self._chunks = []
+
+    def update(self, data):
+        self._chunks.append(bytes(data))
+
+    def result(self):
+        return self._func(b''.join(self._chunks))
+
+
+_ZLIB_CHECKSUMS = {'crc32': zlib.crc32, 'adler32': zlib.adler32}
+_RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def _make_checksum(hashfunc):
+    if callable(hashfunc):
+        return _CallableChecksum(hashfunc)
+    if hashfunc in _ZLIB_CHECKSUMS:
+        return _ZlibChecksum(_ZLIB_CHECKSUMS[hashfunc])
+    return _HashlibChecksum(hashfunc)
+
+
+def _default_checksumfield(hashfunc):
+    if callable(hashfunc):
+        raise ValueError('checksumfield is required for a custom hash function')
+    if hashfunc in _ZLIB_CHECKSUMS:
+        return _lib.Int32ub
+    return _lib.Bytes(hashlib.new(hashfunc).digest_size)
+
+
+def _update_from_range(checksum, stream, start, end, building, path):
+    if isinstance(stream, io.BytesIO):
+        if building:
+            with stream.getbuffer() as buffer, buffer[start:end] as view:
+                checksum.update(view)
+        else:
+            # getvalue() shares the parsed bytes object instead of copying it
+            with memoryview(stream.getvalue()) as buffer, buffer[start:end] as view:
+                checksum.update(view)
+        return
+    _lib.stream_seek(stream, start, 0, path)
+    remaining = end - start
+    while remaining:
+        chunk = _lib.stream_read(stream, min(remaining, _RANGE_CHUNK_SIZE), path)
+        checksum.update(chunk)
+        remaining -= len(chunk)
+
+
+class _Checksummed(_lib.Subconstruct):
+    """
+    Subcon followed by a checksum of exactly the bytes the subcon occupies.
+
+    Unlike construct.Checksum, the hashed bytes are taken from the stream itself,
+    so nothing is rebuilt to verify the checksum.
+    """
+
+    def __init__(self, subcon, checksumfield, hashfunc, verify=True):
+        super().__init__(subcon)
+        self.checksumfield = checksumfield
+        self.hashfunc = hashfunc
+        self.verify = verify
+
+    def _parse(self, stream, context, path):
+        start = _lib.stream_tell(stream, path)
+        obj = self.subcon._parsereport(stream, context, path)
+        end = _lib.stream_tell(stream, path)
+        verify = self.verify and context._params.get('verify_checksums', True)
+        if verify:
+            checksum = _make_checksum(self.hashfunc)
+            _update_from_range(checksum, stream, start, end, False, path)
+            _lib.stream_seek(stream, end, 0, path)
+        expected = self.checksumfield._parsereport(stream, context, path)
+        if verify and checksum.result() != expected:
+            raise _lib.ChecksumError(
+                f'wrong checksum, read {expected!r}, computed {checksum.result()!r}',
+                path=path
+            )
+        return obj
+
+    def _build(self, obj, stream, context, path):
+        start = _lib.stream_tell(stream, path)
+        self.subcon._build(obj, stream, context, path)
+        end = _lib.stream_tell(stream, path)
+        checksum = _make_checksum(self.hashfunc)
+        _update_from_range(checksum, stream, start, end, True, path)
+        _lib.stream_seek(stream, end, 0, path)
+        self.checksumfield._build(checksum.result(), stream, context, path)
+        return obj
+
+    def _sizeof(self, context, path):
+        return self.subcon._sizeof(context, path) + self.checksumfield._sizeof(context, path)
+
+    def _trusted_copy(self):
+        return type(self)(self.subcon, self.checksumfield, self.hashfunc, verify=False)
+
+
+@dataclasses.dataclass
+class Checksum(core.ModelFeature):
+    """
+    Model followed by a checksum of its raw bytes.
+
+    hashfunc is 'crc32', 'adler32', any hashlib algorithm name
+    or a callable taking bytes. Verification can be turned off per model
+    with verify=False or per call with loads(..., verify_checksums=False).
+    """
+    hashfunc: str | Callable[[bytes], Any] = 'crc32'
+    model: Any = None
+    checksumfield: Any = None
+    verify: bool = True
+
+    def _get_construct_factory(self):
+        if self.checksumfield is None:
+            checksumfield = _default_checksumfield(self.hashfunc)
+        else:
+            checksumfield = util.make_model(self.checksumfield)._construct()
+        return lambda subcon: _Checksummed(subcon, checksumfield, self.hashfunc, self.verify)
+
+    def _load(self, data, context):
+        if isinstance(data, (bytes, bytearray)):
+            data = core._current_construct(self).parse(data, **(context or {}))
+        return self.model._load(data, context)
 
 
 class Computed(core.Model):
@@ -83,8 +231,12 @@ class Sequence(list, core.StorageBasedModel):
     _models = None
 
     def __init_subclass__(cls):
+        # never inherit cache
+        cls._cache = None
+        cls._trusted_cache = None
         if cls._models:
             cls._models = [util.make_model(model) for model in cls._models]
+            core._register(cls)
 
     def __init__(self, *values):
         super().__init__(
@@ -94,9 +246,15 @@ class Sequence(list, core.StorageBasedModel):
     @classmethod
     def _construct(cls):
         if not cls._cache:
-            cls._cache = cls._impl(*(model._construct() for model in cls._models))
+            with core._cache_lock:
+                if not cls._cache:
+                    cls._cache = cls._impl(*(model._construct() for model in cls._models))
         return cls._cache
 
+    @classmethod
+    def _submodels(cls):
+        return list(cls._models or ())
+
     @classmethod
     def _init(cls, obj, context=None):
         if isinstance(obj, (cls, core.LazyStorageBased)):
@@ -131,29 +289,69 @@ class Sequence(list, core.StorageBasedModel):
 
     @classmethod
     def _eager_load(cls, data, context):
-        initlist = []
-        for elem, model in zip(data, cls._models):
-            initlist.append(model._load(elem, context))
-        return cls(*data)
+        instance = cls.__new__(cls)
+        # loaded values need no further _init()
+        list.extend(instance, [
+            model._load(elem, context) for elem, model in zip(data, cls._models)
+        ])
+        return instance
+
+    @classmethod
+    def _load_record(cls, data, context):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = cls._parse(data, context)
+        return tuple(model._load_record(elem, context) for elem, model in zip(data, cls._models))
 
     def _get_storage(self):
-        return self
+        return [core.storage(value) for value in self]
 
 
 class FocusedSeq(Sequence):
-    """Port to construct.FocusedSeq"""
+    """
+    Port to construct.FocusedSeq
+
+    Loads into the value of the focused element only, the others are parsed and discarded.
+    """
 
     _impl = _lib.FocusedSeq  # (parsebuildfrom, *subcons, **subconskw)
     _parsebuildfrom = None
     _storage_based = False
-    # TODO
+
+    @classmethod
+    def _focused_model(cls):
+        """Return the model of the focused element, or None if it is only known at parse time."""
+        for model in cls._models:
+            if getattr(model, 'newname', None) == cls._parsebuildfrom:
+                return model
+        return None
+
+    @classmethod
+    def _init(cls, obj, context=None):
+        model = cls._focused_model()
+        return obj if model is None else model._init(obj, context)
+
+    @classmethod
+    def _load(cls, data, context):
+        if isinstance(data, (bytes, bytearray)):
+            data = cls._parse(data, context)
+        model = cls._focused_model()
+        return data if model is None else model._load(data, context)
+
+    @classmethod
+    def _load_record(cls, data, context):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = cls._parse(data, context)
+        model = cls._focused_model()
+        return data if model is None else model._load_record(data, context)
 
     @classmethod
     def _construct(cls):
         if not cls._cache:
-            cls._cache = cls._impl(
-                cls._parsebuildfrom, *(model._construct() for model in cls._models)
-            )
+            with core._cache_lock:
+                if not cls._cache:
+                    cls._cache = cls._impl(
+                        cls._parsebuildfrom, *(model._construct() for model in cls._models)
+                    )
         return cls._cache
 
 
@@ -174,6 +372,7 @@ class Switch(core.Model):
         self._keyfunc = keyfunc
         self._cases = {}
         self._cases_cs = {}
+        self._register_lock = threading.Lock()
         for case, model in (cases or {}).items():
             self.register(case, model)
         self._default = util.make_model(default) if default else None
@@ -182,16 +381,25 @@ class Switch(core.Model):
     def register(self, case, model=None):
         if model is None:
             return functools.partial(self.register, case)
-        if case in self._cases:
-            raise ValueError(
-                f'case {case!r} already exists '
-                '- consider registering a Switch/Select for this case'
-            )
         model = util.make_model(model)
-        self._cases[case] = model
-        self._cases_cs[case] = model._construct()
+        construct = model._construct()
+        with self._register_lock:
+            if case in self._cases:
+                raise ValueError(
+                    f'case {case!r} already exists '
+                    '- consider registering a Switch/Select for this case'
+                )
+            # updated in place, the constructs of parent models hold on to this dict
+            self._cases_cs[case] = construct
+            self._cases[case] = model
         return model
 
+    def _submodels(self):
+        cases = list(self._cases.values())
+        if self._default is not None:
+            cases.append(self._default)
+        return cases
+
     def _init(self, data, context=None):
         if not context:
             raise ValueError('context is required for Switch')
@@ -217,6 +425,15 @@ class Switch(core.Model):
             raise ValueError(f'no case for {case!r}')
         return impl._load(data, context)
 
+    def _load_record(self, data, context):
+        if not context:
+            raise ValueError('context is required for Switch')
+        case = self._keyfunc(context)
+        impl = self._cases.get(case, self._default)
+        if impl is None:
+            raise ValueError(f'no case for {case!r}')
+        return impl._load_record(data, context)
+
     def _dump(self, obj, **context):
         if not context:
             raise ValueError('context is required for Switch')
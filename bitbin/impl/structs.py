@@ -15,8 +15,96 @@ class Struct(core.ModelDataclass, _bitbin=True):
     _impl = _lib.Struct
 
 
+class _BitFields(_lib.Construct):
+    """
+    Fixed-width bit fields decoded with shifts and masks over the whole bitfield.
+
+    Equivalent to construct.BitStruct of BitsInteger/Flag fields,
+    but never restreams the input into one byte per bit.
+    """
+
+    def __init__(self, layout, nbytes):
+        super().__init__()
+        self.layout = layout
+        self.nbytes = nbytes
+
+    def _parse(self, stream, context, path):
+        value = int.from_bytes(_lib.stream_read(stream, self.nbytes, path), 'big')
+        obj = _lib.Container()
+        for name, shift, length, mask, signed, swapped, flag in self.layout:
+            field = (value >> shift) & mask
+            if flag:
+                field = field == 1
+            else:
+                if swapped:
+                    field = int.from_bytes(field.to_bytes(length // 8, 'big'), 'little')
+                if signed and field >> (length - 1):
+                    field -= 1 << length
+            obj[name] = field
+        return obj
+
+    def _build(self, obj, stream, context, path):
+        value = 0
+        for name, shift, length, mask, signed, swapped, flag in self.layout:
+            field = obj[name]
+            if flag:
+                field = 1 if field else 0
+            else:
+                if not isinstance(field, int):
+                    raise _lib.IntegerError(f'value {field!r} is not an integer', path=path)
+                if signed:
+                    fits = -(1 << (length - 1)) <= field < 1 << (length - 1)
+                else:
+                    fits = 0 <= field <= mask
+                if not fits:
+                    raise _lib.IntegerError(
+                        f'value {field} does not fit in {length} bits', path=path
+                    )
+                field &= mask
+                if swapped:
+                    field = int.from_bytes(field.to_bytes(length // 8, 'little'), 'big')
+            value |= field << shift
+        _lib.stream_write(stream, value.to_bytes(self.nbytes, 'big'), self.nbytes, path)
+        return obj
+
+    def _sizeof(self, context, path):
+        return self.nbytes
+
+
+def _bit_fields_layout(subcons):
+    fields = []
+    for name, subcon in subcons.items():
+        if isinstance(subcon, _lib.BitsInteger):
+            length = subcon.length
+            if not isinstance(length, int) or length < 1:
+                return None
+            if subcon.swapped and length % 8:
+                return None
+            fields.append((name, length, subcon.signed, subcon.swapped, False))
+        elif subcon is _lib.Flag:
+            fields.append((name, 1, False, False, True))
+        else:
+            return None
+    total = sum(length for _, length, *_ in fields)
+    if total % 8:
+        return None
+    layout = []
+    shift = total
+    for name, length, signed, swapped, flag in fields:
+        shift -= length
+        layout.append((name, shift, length, (1 << length) - 1, signed, swapped, flag))
+    return layout, total // 8
+
+
+def _bit_struct(**subcons):
+    layout = _bit_fields_layout(subcons)
+    if layout is None:
+        return _lib.BitStruct(**subcons)
+    return _BitFields(*layout)
+
+
 class BitStruct(core.ModelDataclass, _bitbin=True):
-    _impl = _lib.BitStruct
+    _impl = staticmethod(_bit_struct)
 
 
 class LazyStruct(core.ModelDataclass, _bitbin=True):
@@ -33,18 +121,20 @@ class AlignedStruct(core.ModelDataclass, _bitbin=True):
     def __init_subclass__(
             cls, _bitbin=False,
             stack_offset=1,
-            annotation_mgr=None
+            annotation_mgr=None,
+            **kwargs
     ):
         if _bitbin:
             return
         super().__init_subclass__(
             stack_offset=stack_offset+1,
-            annotation_mgr=annotation_mgr
+            annotation_mgr=annotation_mgr,
+            **kwargs
         )
         cls._impl = functools.partial(cls._impl, cls._modulus)
 
 
-class Union(core.ModelDataclass):
+class Union(core.ModelDataclass, _bitbin=True):
     """Port to construct.Union"""
 
     _impl = _lib.Union  # (parsefrom, *subcons, **subconskw)
@@ -0,0 +1,246 @@
+"""Opt-in profiling of model loading, dumping and initialization."""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+import threading
+import time
+
+from bitbin import core
+
+
+__all__ = (
+    'instrument',
+    'Instrumentation',
+    'ModelStats',
+    'Stats',
+)
+
+
+_HOOKED_METHODS = ('_load', '_dump', '_init')
+
+
+@dataclasses.dataclass
+class Stats:
+    calls: int = 0
+    time: float = 0.0
+    nbytes: int = 0
+
+    def add(self, elapsed, nbytes=0):
+        self.calls += 1
+        self.time += elapsed
+        self.nbytes += nbytes
+
+
+@dataclasses.dataclass
+class ModelStats:
+    name: str
+    model: object = dataclasses.field(repr=False)
+    load: Stats = dataclasses.field(default_factory=Stats)
+    dump: Stats = dataclasses.field(default_factory=Stats)
+    init: Stats = dataclasses.field(default_factory=Stats)
+    fields: dict[str, ModelStats] = dataclasses.field(default_factory=dict)
+
+
+def _model_name(model):
+    if isinstance(model, type):
+        return model.__qualname__
+    lib_object = getattr(model, '_lib_object', None)
+    if lib_object is not None:
+        fmtstr = getattr(lib_object, 'fmtstr', None)
+        return f'{type(model).__name__}({lib_object}{f" {fmtstr!r}" if fmtstr else ""})'
+    return type(model).__name__
+
+
+def _nbytes(data):
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return len(data)
+    return 0
+
+
+def _iter_model_classes():
+    seen = set()
+    stack = [core.Model]
+    while stack:
+        cls = stack.pop()
+        if cls in seen:
+            continue
+        seen.add(cls)
+        yield cls
+        stack.extend(type.__subclasses__(cls))
+
+
+class Instrumentation:
+    """
+    Collects call counts, cumulative time and bytes processed per model.
+
+    While disabled, no model method is wrapped, so there is no overhead at all.
+    Enabling wraps _load(), _dump() and _init() of every model class
+    and, if requested, times every field in ModelDataclass loading and initialization.
+    Classes defined while enabled inherit the wrapped methods, but methods they define
+    themselves are only instrumented the next time instrumentation is enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.fields = False
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._switch_lock = threading.Lock()
+        self._local = threading.local()
+        self._originals = []
+
+    def stats(self, model=None):
+        with self._lock:
+            if model is not None:
+                entry = self._stats.get(id(model))
+                return entry and entry[1]
+            return sorted(
+                (stats for _, stats in self._stats.values()),
+                key=lambda stats: stats.load.time + stats.dump.time + stats.init.time,
+                reverse=True
+            )
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def enable(self, fields=False):
+        with self._switch_lock:
+            self._disable()
+            self._enable(fields)
+
+    def disable(self):
+        with self._switch_lock:
+            self._disable()
+
+    def _enable(self, fields):
+        for cls in _iter_model_classes():
+            for name in _HOOKED_METHODS:
+                descriptor = cls.__dict__.get(name)
+                if descriptor is None:
+                    continue
+                self._originals.append((cls, name, descriptor))
+                setattr(cls, name, self._wrap_descriptor(descriptor, name.lstrip('_')))
+        if fields:
+            mdc = core.ModelDataclass
+            for name, operation in (('_load_field', 'load'), ('_init_field', 'init')):
+                descriptor = mdc.__dict__[name]
+                self._originals.append((mdc, name, descriptor))
+                if isinstance(descriptor, classmethod):
+                    hook = classmethod(self._wrap_field(descriptor.__func__, operation))
+                else:
+                    hook = self._wrap_field(descriptor, operation)
+                setattr(mdc, name, hook)
+        self.enabled = True
+        self.fields = fields
+
+    def _disable(self):
+        while self._originals:
+            cls, name, descriptor = self._originals.pop()
+            setattr(cls, name, descriptor)
+        self.enabled = False
+        self.fields = False
+
+    def _get_stats(self, model):
+        if isinstance(model, core.StorageBasedModel):
+            # instance methods of storage-based models are called on the data
+            model = type(model)
+        entry = self._stats.get(id(model))
+        if entry is None or entry[0] is not model:
+            entry = self._stats[id(model)] = (model, ModelStats(_model_name(model), model))
+        return entry[1]
+
+    def _record(self, model, operation, elapsed, nbytes=0, field_name=None):
+        with self._lock:
+            stats = self._get_stats(model)
+            if field_name is not None:
+                stats = stats.fields.get(field_name) or stats.fields.setdefault(
+                    field_name, ModelStats(field_name, model)
+                )
+            getattr(stats, operation).add(elapsed, nbytes)
+
+    def _wrap_descriptor(self, descriptor, operation):
+        if isinstance(descriptor, classmethod):
+            return classmethod(self._wrap(descriptor.__func__, operation))
+        if isinstance(descriptor, staticmethod):
+            return descriptor
+        return self._wrap(descriptor, operation)
+
+    def _wrap(self, func, operation):
+        active = self._local
+
+        @functools.wraps(func)
+        def wrapper(model, *args, **kwargs):
+            # super() calls within the same model are counted once
+            key = (id(model), operation)
+            running = active.__dict__.setdefault('running', set())
+            if key in running:
+                return func(model, *args, **kwargs)
+            running.add(key)
+            start = time.perf_counter()
+            try:
+                result = func(model, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                running.discard(key)
+            if operation == 'load':
+                nbytes = _nbytes(args[0] if args else kwargs.get('data'))
+            elif operation == 'dump':
+                nbytes = _nbytes(result)
+            else:
+                nbytes = 0
+            self._record(model, operation, elapsed, nbytes)
+            return result
+
+        return wrapper
+
+    def _wrap_field(self, func, operation):
+        record = self._record
+
+        @functools.wraps(func)
+        def wrapper(model, name, *args):
+            start = time.perf_counter()
+            try:
+                return func(model, name, *args)
+            finally:
+                record(model, operation, time.perf_counter() - start, field_name=name)
+
+        return wrapper
+
+
+instrumentation = Instrumentation()
+
+
+class _InstrumentationState:
+    def __init__(self, previous):
+        self._previous = previous
+
+    def __enter__(self):
+        return instrumentation
+
+    def __exit__(self, *exc_info):
+        enabled, fields = self._previous
+        if enabled:
+            instrumentation.enable(fields)
+        else:
+            instrumentation.disable()
+
+
+def instrument(enabled=True, *, fields=False):
+    """
+    Turn model profiling on or off.
+
+    Can also be used as a context manager that restores the previous state on exit::
+
+        with bitbin.instrument(fields=True) as inst:
+            bitbin.loads(Packet, data)
+        print(inst.stats())
+    """
+    previous = instrumentation.enabled, instrumentation.fields
+    if enabled:
+        instrumentation.enable(fields)
+    else:
+        instrumentation.disable()
+    return _InstrumentationState(previous)
@@ -0,0 +1,564 @@
+"""Bulk access to sequences of repeated records."""
+
+from __future__ import annotations
+
+import array
+import bisect
+import collections.abc
+import concurrent.futures
+import dataclasses
+import io
+import itertools
+import mmap
+import operator
+import os
+import platform
+import queue
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import construct as _lib
+
+from bitbin import core
+
+
+__all__ = (
+    'load_columns',
+    'loads_many',
+    'RecordFile',
+    'SharedRing',
+)
+
+
+COLUMN_CHUNK_SIZE = 4096  # records decoded per chunk of a stream
+COLUMN_WINDOW_SIZE = 64 * 1024  # bytes read at a time from unseekable streams
+
+
+def _array_typecode(code):
+    """Return the narrowest array typecode holding values of a standard-size struct code."""
+    size = struct.calcsize(f'<{code}')
+    if code in 'efd':
+        candidates = 'fd'
+    else:
+        candidates = 'bhilq' if code.islower() else 'BHILQ'
+    # array itemsizes are the platform's C sizes, 'l' is 8 bytes on LP64
+    return min(
+        (typecode for typecode in candidates if array.array(typecode).itemsize >= size),
+        key=lambda typecode: array.array(typecode).itemsize
+    )
+
+
+_TYPECODES = {code: _array_typecode(code) for code in 'bBhHiIlLqQefd'}
+_first = operator.itemgetter(0)
+
+
+def _field_format(model, construct):
+    """Return a struct format (byte order, code) for fields decodable without construct."""
+    if getattr(model, '_pass_context', True):
+        return None
+    loader = getattr(model, '_loader', None)
+    if isinstance(construct, _lib.FormatField):
+        if loader in (int, float) and construct.fmtstr[1:] in _TYPECODES:
+            return construct.fmtstr[0], construct.fmtstr[1:]
+    elif isinstance(construct, _lib.Bytes) and isinstance(construct.length, int):
+        if loader is bytes:
+            return '<', f'{construct.length}s'
+    return None
+
+
+def _new_column(field_format):
+    if field_format is not None and field_format[1] in _TYPECODES:
+        return array.array(_TYPECODES[field_format[1]])
+    return []
+
+
+def _fixed_columns(model, layout, names, chunks, context):
+    record_size = model._sizeof()
+    models = {f.name: f.metadata['model'] for f in dataclasses.fields(model)}
+    decoders = []
+    columns = {}
+    for name, offset, size, construct in layout:
+        if name not in names:
+            continue
+        field_format = _field_format(models[name], construct)
+        columns[name] = _new_column(field_format)
+        if field_format is not None:
+            byteorder, code = field_format
+            padding = record_size - offset - size
+            unpacker = struct.Struct(f'{byteorder}{offset}x{code}{padding}x')
+            decoders.append((columns[name], unpacker, None, None, None))
+        else:
+            decoders.append((columns[name], None, models[name], construct, (offset, size)))
+    for chunk in chunks:
+        for column, unpacker, field_model, construct, span in decoders:
+            if unpacker is not None:
+                column.extend(map(_first, unpacker.iter_unpack(chunk)))
+                continue
+            offset, size = span
+            for start in range(offset, len(chunk), record_size):
+                parsed = construct.parse(chunk[start:start + size], **context)
+                column.append(field_model._load_record(parsed, context))
+    return columns
+
+
+def _iter_chunks(source, record_size, count):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source).cast('B')
+        if count is not None:
+            view = view[:count * record_size]
+        if len(view) % record_size:
+            raise _lib.StreamError(
+                f'buffer of {len(view)} bytes is not a whole number of {record_size}-byte records'
+            )
+        yield view
+        return
+    remaining = count
+    while remaining is None or remaining > 0:
+        records = COLUMN_CHUNK_SIZE if remaining is None else min(remaining, COLUMN_CHUNK_SIZE)
+        want = records * record_size
+        chunk = source.read(want)
+        while chunk and len(chunk) < want:
+            more = source.read(want - len(chunk))
+            if not more:
+                break
+            chunk += more
+        if len(chunk) % record_size:
+            raise _lib.StreamError(f'stream ended inside a {record_size}-byte record')
+        if not chunk:
+            return
+        yield chunk
+        if remaining is not None:
+            remaining -= len(chunk) // record_size
+        if len(chunk) < want:
+            return
+
+
+def load_columns(model, source, *, fields=None, count=None, numpy=False, **context):
+    """
+    Decode repeated records of a model into one column per field.
+
+    The source is a bytes-like object or a binary stream of back-to-back records.
+    Numeric fields of fixed-size models are decoded straight into array.array columns,
+    other fields into lists; no model instances are created.
+    Pass fields= to decode only some of the columns, count= to stop after that many records,
+    and numpy=True to get NumPy arrays instead of array.array columns.
+    Streams are read in chunks of whole records, or in windows of COLUMN_WINDOW_SIZE bytes
+    if records vary in size and the stream is not seekable.
+    """
+    names = list(fields) if fields is not None else [f.name for f in dataclasses.fields(model)]
+    layout = model._layout()
+    if layout is not None:
+        chunks = _iter_chunks(source, model._sizeof(), count)
+        columns = _fixed_columns(model, layout, set(names), chunks, context)
+    else:
+        columns = _parsed_columns(model, set(names), source, count, context)
+    missing = set(names).difference(columns)
+    if missing:
+        raise AttributeError(f'{model.__name__} has no fields {sorted(missing)!r}')
+    if numpy:
+        import numpy as np
+        for name, column in columns.items():
+            if isinstance(column, array.array):
+                columns[name] = np.frombuffer(column, dtype=column.typecode)
+    return {name: columns[name] for name in names}
+
+
+def _parsed_columns(model, names, source, count, context):
+    construct = model._construct()
+    field_models = [
+        (f.name, f.metadata['model'], f.name in names) for f in dataclasses.fields(model)
+    ]
+    columns = {
+        name: _new_column(_field_format(field_model, field_model._construct()))
+        for name, field_model, wanted in field_models if wanted
+    }
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        records = _parse_records(construct, io.BytesIO(source), context)
+    elif source.seekable():
+        records = _parse_records(construct, source, context)
+    else:
+        records = _parse_windows(construct, source, context)
+    for data in itertools.islice(records, count):
+        if model._retain_source:
+            data = data.value
+        for name, field_model, wanted in field_models:
+            value = data[name]
+            if wanted:
+                value = field_model._load_record(value, context)
+                columns[name].append(value)
+            context[name] = value
+    return columns
+
+
+def _parse_records(construct, stream, context):
+    position = stream.tell()
+    end = stream.seek(0, io.SEEK_END)
+    stream.seek(position)
+    while stream.tell() < end:
+        yield construct.parse_stream(stream, **context)
+
+
+def _parse_windows(construct, source, context):
+    """Parse back-to-back records from a non-seekable stream, read a window at a time."""
+    window = io.BytesIO()
+    end = 0
+    exhausted = False
+    while True:
+        start = window.tell()
+        if start == end and exhausted:
+            return
+        try:
+            if start == end:
+                raise _lib.StreamError('window consumed')
+            data = construct.parse_stream(window, **context)
+        except _lib.ConstructError:
+            if exhausted:
+                raise
+            # the record may go on past the window, retry it with more data
+            more = source.read(COLUMN_WINDOW_SIZE)
+            exhausted = not more
+            buffered = window.getvalue()[start:] + more
+            window, end = io.BytesIO(buffered), len(buffered)
+            continue
+        yield data
+
+
+def _gil_enabled():
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is None or is_gil_enabled()
+
+
+def _loads_chunk(model, chunk, kwargs):
+    return [core.loads(model, data, **kwargs) for data in chunk]
+
+
+def loads_many(model, buffers, *, max_workers=None, executor=None, chunksize=256, **kwargs):
+    """
+    Load many encoded instances of a model, in parallel on free-threaded Python builds.
+
+    Buffers are decoded in chunks by a thread pool (or the given executor),
+    keyword arguments are passed to loads(). Return a list of the loaded instances.
+    If the GIL is enabled and no executor or max_workers is given, decode in this thread,
+    as threads would only add overhead.
+    """
+    core.warmup(model)
+    if executor is None and max_workers is None and _gil_enabled():
+        max_workers = 1
+    buffers = iter(buffers)
+    chunks = iter(lambda: list(itertools.islice(buffers, chunksize)), [])
+    if executor is None and max_workers == 1:
+        return [instance for chunk in chunks for instance in _loads_chunk(model, chunk, kwargs)]
+    if executor is not None:
+        return _map_chunks(executor, model, chunks, kwargs)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        return _map_chunks(executor, model, chunks, kwargs)
+
+
+def _map_chunks(executor, model, chunks, kwargs):
+    futures = [executor.submit(_loads_chunk, model, chunk, kwargs) for chunk in chunks]
+    return [instance for future in futures for instance in future.result()]
+
+
+class _KeyColumn(collections.abc.Sequence):
+    """Lazily decoded values of one field of every record in a RecordFile."""
+
+    def __init__(self, records, name):
+        self._records = records
+        for field_name, offset, size, construct in records.model._layout():
+            if field_name == name:
+                break
+        else:
+            raise AttributeError(f'{records.model.__name__} has no field {name!r}')
+        self._model = records.model.__dataclass_fields__[name].metadata['model']
+        self._construct = construct
+        self._offset = offset
+        self._size = size
+        field_format = _field_format(self._model, construct)
+        self._unpacker = struct.Struct(''.join(field_format)) if field_format else None
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start = self._records._position(index) + self._offset
+        buffer = self._records._buffer
+        if self._unpacker is not None:
+            return self._unpacker.unpack_from(buffer, start)[0]
+        context = dict(self._records.context)
+        parsed = self._construct.parse(buffer[start:start + self._size], **context)
+        return self._model._load_record(parsed, context)
+
+
+class RecordFile(collections.abc.Sequence):
+    """
+    Random access to a file of back-to-back fixed-size records, backed by mmap.
+
+    Only the records (and key fields) that are accessed are decoded.
+    The bisect methods and find() expect the file to be sorted by the key field.
+    """
+
+    def __init__(self, model, path, key=None, *, offset=0, as_record=False, **context):
+        if model._layout() is None:
+            raise TypeError(f'{model.__name__} does not have a fixed-size layout')
+        self.model = model
+        self.key = key
+        self.as_record = as_record
+        self.context = context
+        self._record_size = model._sizeof()
+        self._offset = offset
+        self._keys = {}
+        with open(path, 'rb') as fp:
+            size = os.fstat(fp.fileno()).st_size
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._buffer = memoryview(self._mmap if self._mmap is not None else b'')
+        data_size = max(size - offset, 0)
+        if data_size % self._record_size:
+            raise _lib.StreamError(
+                f'{data_size} bytes is not a whole number of {self._record_size}-byte records'
+            )
+        self._length = data_size // self._record_size
+
+    def __len__(self):
+        return self._length
+
+    def _position(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('record index out of range')
+        return self._offset + index * self._record_size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        start = self._position(index)
+        view = self._buffer[start:start + self._record_size]
+        context = dict(self.context)
+        if self.as_record:
+            return self.model._load_record(view, context)
+        return self.model._load_from_container(self.model._parse(view, context), context)
+
+    def keys(self, key=None):
+        """Return a lazy sequence of the values of the key field."""
+        key = key or self.key
+        if key is None:
+            raise TypeError('no key field given')
+        column = self._keys.get(key)
+        if column is None:
+            column = self._keys[key] = _KeyColumn(self, key)
+        return column
+
+    def bisect_left(self, value, key=None, lo=0, hi=None):
+        return bisect.bisect_left(self.keys(key), value, lo, self._length if hi is None else hi)
+
+    def bisect_right(self, value, key=None, lo=0, hi=None):
+        return bisect.bisect_right(self.keys(key), value, lo, self._length if hi is None else hi)
+
+    def find(self, value, key=None):
+        """Return the first record whose key equals the value."""
+        index = self.bisect_left(value, key)
+        if index == self._length or self.keys(key)[index] != value:
+            raise KeyError(value)
+        return self[index]
+
+    def between(self, low, high, key=None):
+        """Iterate over the records with low <= key < high."""
+        for index in range(self.bisect_left(low, key), self.bisect_left(high, key)):
+            yield self[index]
+
+    def close(self):
+        self._keys.clear()
+        self._buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _record_struct(model):
+    """Return a struct.Struct packing a whole fixed-size record, if all its fields allow it."""
+    models = {f.name: f.metadata['model'] for f in dataclasses.fields(model)}
+    byteorders = set()
+    codes = []
+    for name, offset, size, construct in model._layout():
+        field_format = _field_format(models[name], construct)
+        if field_format is None:
+            return None
+        byteorder, code = field_format
+        if size > 1 and not code.endswith('s'):
+            byteorders.add(byteorder)
+        codes.append(code)
+    if len(byteorders) > 1:
+        return None
+    return struct.Struct((byteorders.pop() if byteorders else '<') + ''.join(codes))
+
+
+class _Borrowed:
+    def __init__(self, ring, view):
+        self._ring = ring
+        self._view = view
+
+    def __enter__(self):
+        return self._view
+
+    def __exit__(self, *exc_info):
+        self._view.release()
+        self._ring._release()
+
+
+def _attach(name):
+    """Attach to a shared memory block without taking ownership of it."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    shm = shared_memory.SharedMemory(name)
+    if os.name == 'posix':
+        # the tracker would otherwise unlink the block when this process exits
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+class SharedRing:
+    """
+    Single-producer, single-consumer ring of fixed-size records in shared memory.
+
+    Pass a capacity to create the shared memory block, or only its name to attach to one.
+    The producer dumps records straight into their slots and publishes them by bumping
+    a counter, the consumer loads them or borrows zero-copy views of their bytes.
+    Publishing relies on aligned 8-byte stores being atomic and on stores becoming
+    visible to the other process in program order, as on x86-64. Weakly ordered CPUs
+    such as ARM64 do not guarantee the latter, so rings cannot be used there and
+    RuntimeError is raised; use a multiprocessing.Queue on such machines.
+
+    Only the creator of a ring owns its shared memory block: attaching to a ring
+    does not register the block with the resource tracker, so a consumer process
+    exiting does not unlink it.
+    """
+
+    _MAGIC = b'bitbinr1'
+    _HEADER = struct.Struct('<8sQQ')  # magic, record size, capacity
+    _HEAD_OFFSET = 64  # counters live in separate cache lines
+    _TAIL_OFFSET = 128
+    _DATA_OFFSET = 192
+    _MACHINES = ('x86_64', 'amd64')
+
+    def __init__(self, model, name=None, capacity=None, **context):
+        if platform.machine().lower() not in self._MACHINES:
+            raise RuntimeError(f'shared rings are not supported on {platform.machine()}')
+        if model._layout() is None:
+            raise TypeError(f'{model.__name__} does not have a fixed-size layout')
+        self.model = model
+        self.context = context
+        self._record_size = model._sizeof()
+        self._struct = _record_struct(model)
+        self._fields = [f.name for f in dataclasses.fields(model)]
+        if capacity is None:
+            if name is None:
+                raise TypeError('either the name of an existing ring or a capacity is required')
+            self._shm = _attach(name)
+            magic, record_size, capacity = self._HEADER.unpack_from(self._shm.buf)
+            if magic != self._MAGIC or record_size != self._record_size:
+                self._shm.close()
+                raise ValueError(f'shared memory {name!r} is not a ring of {model.__name__}')
+        else:
+            size = self._DATA_OFFSET + capacity * self._record_size
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+            self._HEADER.pack_into(self._shm.buf, 0, self._MAGIC, self._record_size, capacity)
+        self.capacity = capacity
+        buffer = self._shm.buf
+        self._head = buffer[self._HEAD_OFFSET:self._HEAD_OFFSET + 8].cast('Q')
+        self._tail = buffer[self._TAIL_OFFSET:self._TAIL_OFFSET + 8].cast('Q')
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __len__(self):
+        return self._head[0] - self._tail[0]
+
+    def _slot(self, counter):
+        return self._DATA_OFFSET + counter % self.capacity * self._record_size
+
+    @staticmethod
+    def _wait(ready, block, timeout, error):
+        if ready():
+            return
+        if not block:
+            raise error
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0
+        while not ready():
+            if deadline is not None and time.monotonic() >= deadline:
+                raise error
+            time.sleep(delay)
+            delay = min(delay * 2 or 1e-6, 1e-3)
+
+    def put(self, obj, block=True, timeout=None):
+        """Dump a model instance (or what initializes one) into the next free slot."""
+        head = self._head[0]
+        self._wait(lambda: head - self._tail[0] < self.capacity, block, timeout, queue.Full)
+        offset = self._slot(head)
+        instance = self.model._init(obj)
+        data = core.storage(instance)
+        buffer = self._shm.buf
+        if self._struct is not None and not self.model._retain_source:
+            self._struct.pack_into(buffer, offset, *map(data.__getitem__, self._fields))
+        else:
+            buffer[offset:offset + self._record_size] = instance._dump(**self.context)
+        self._head[0] = head + 1
+
+    def put_nowait(self, obj):
+        self.put(obj, block=False)
+
+    def _next(self, block, timeout):
+        tail = self._tail[0]
+        self._wait(lambda: self._head[0] != tail, block, timeout, queue.Empty)
+        offset = self._slot(tail)
+        return self._shm.buf[offset:offset + self._record_size]
+
+    def _release(self):
+        self._tail[0] += 1
+
+    def get(self, block=True, timeout=None, *, as_record=False):
+        """Load the oldest record and free its slot."""
+        view = self._next(block, timeout)
+        try:
+            context = dict(self.context)
+            if as_record:
+                return self.model._load_record(view, context)
+            return self.model._load_from_container(self.model._parse(view, context), context)
+        finally:
+            view.release()
+            self._release()
+
+    def get_nowait(self, *, as_record=False):
+        return self.get(block=False, as_record=as_record)
+
+    def borrow(self, block=True, timeout=None):
+        """
+        Return a context manager over a zero-copy view of the oldest record's bytes.
+
+        Its slot is freed only when the with-block exits.
+        """
+        return _Borrowed(self, self._next(block, timeout))
+
+    def close(self):
+        self._head.release()
+        self._tail.release()
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -9,8 +9,8 @@ setup(
     long_description_content_type='text/markdown',
     author="bswck",
     packages=find_packages(exclude=['tests', '.github']),
-    # entry_points={
-    #     'console_scripts': ['bitbin = bitbin.__main__:main']
-    # },
+    entry_points={
+        'console_scripts': ['bitbin = bitbin.__main__:main']
+    },
     extras_require={'test': ['pytest']},
 )
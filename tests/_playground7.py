@@ -0,0 +1,117 @@
+import gc
+import os
+import tracemalloc
+
+import bitbin as bb
+
+
+bb.set_endianness(bb.LITTLE_ENDIAN)
+
+ROUNDS = int(os.environ.get('ROUNDS', 200))  # calls measured per operation
+RETAINED = int(os.environ.get('RETAINED', 1000))  # instances kept alive to measure their size
+TOP_SITES = 3
+
+
+class Point(bb.Struct):
+    x: bb.Int32sl
+    y: bb.Int32sl
+
+
+class Segment(bb.Struct):
+    start: Point
+    end: Point
+    weight: bb.Float64l
+
+
+class Polyline(bb.Struct):
+    count: bb.Int16ul
+    points: bb.Array(bb.this.count, Point)
+
+
+class LazySegment(bb.LazyStruct):
+    start: Point
+    end: Point
+    weight: bb.Float64l
+
+
+class Message(bb.Struct):
+    kind: str
+    body: bb.Switch[bb.this.kind, bb.Int32ul]
+
+
+body = bb.models(Message).body
+body.register('point', Point)
+body.register('segment', Segment)
+
+
+class Person(bb.Struct):
+    first_name: str
+    last_name: str
+    email: str
+    city: str
+    country: bb.interned_str
+
+
+CASES = {
+    'nested Struct': (Segment, Segment(Point(1, 2), Point(3, 4), 0.5)),
+    'Array of Struct': (Polyline, Polyline(100, [Point(i, -i) for i in range(100)])),
+    'LazyStruct': (LazySegment, LazySegment(Point(1, 2), Point(3, 4), 0.5)),
+    'Switch': (Message, Message('segment', Segment(Point(1, 2), Point(3, 4), 0.5))),
+    'str-heavy': (Person, Person('Ada', 'Lovelace', 'ada@example.com', 'London', 'UK')),
+}
+
+
+def peak(func, rounds=ROUNDS):
+    """Return the highest memory in use during a call of func, above what was in use before."""
+    func()
+    gc.collect()
+    tracemalloc.start()
+    highest = 0
+    for _ in range(rounds):
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        highest = max(highest, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return highest
+
+
+def retained(model, pkt, count=RETAINED):
+    """Return bytes and blocks kept alive per decoded instance, and where they were allocated."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = [bb.loads(model, pkt) for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del instances
+    stats = after.compare_to(before, 'lineno')
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    sites = sorted(stats, key=lambda stat: stat.size_diff, reverse=True)[:TOP_SITES]
+    return size / count, blocks / count, sites
+
+
+def main():
+    print(f'{"model":<18}{"pkt B":>7}{"loads peak B":>14}{"dumps peak B":>14}'
+          f'{"kept B":>9}{"kept blocks":>13}')
+    sites = {}
+    for name, (model, instance) in CASES.items():
+        pkt = bb.dumps(instance)
+        assert bb.dumps(bb.loads(model, pkt)) == pkt
+        loads_peak = peak(lambda: bb.loads(model, pkt))
+        dumps_peak = peak(lambda: bb.dumps(instance))
+        size, blocks, sites[name] = retained(model, pkt)
+        print(f'{name:<18}{len(pkt):>7}{loads_peak:>14}{dumps_peak:>14}'
+              f'{size:>9.0f}{blocks:>13.1f}')
+    print()
+    print('where kept memory was allocated, per instance:')
+    for name, stats in sites.items():
+        print(f'  {name}')
+        for stat in stats:
+            frame = stat.traceback[0]
+            print(f'    {stat.size_diff / RETAINED:>8.0f} B  {frame.filename}:{frame.lineno}')
+
+
+if __name__ == '__main__':
+    main()
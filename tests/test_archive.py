@@ -0,0 +1,95 @@
+import construct
+import pytest
+
+import bitbin as bb
+
+
+class Sample(bb.Struct):
+    index: bb.Int32ub
+    name: str
+
+
+class Other(bb.Struct):
+    index: bb.Int16ub
+
+
+SAMPLES = [Sample(index, f'sample{index}') for index in range(10)]
+
+
+def test_roundtrip(tmp_path):
+    path = tmp_path / 'samples.bba'
+    with bb.ArchiveWriter(Sample, path, compression='zlib', block_records=4) as writer:
+        writer.write_many(SAMPLES)
+    with bb.ArchiveReader(Sample, path) as reader:
+        assert reader.block_count == 3
+        assert len(reader) == 10
+        assert reader[5] == SAMPLES[5] and reader[-1] == SAMPLES[-1]
+        assert list(reader) == SAMPLES
+        assert reader.read_all(max_workers=2) == SAMPLES
+
+
+def test_append(tmp_path):
+    path = tmp_path / 'samples.bba'
+    with bb.ArchiveWriter(Sample, path, block_records=4) as writer:
+        writer.write_many(SAMPLES[:5])
+    with bb.ArchiveWriter(Sample, path, compression='lzma', append=True) as writer:
+        writer.write_many(SAMPLES[5:])
+    with bb.ArchiveReader(Sample, path) as reader:
+        assert list(reader) == SAMPLES
+
+
+def test_many_appends(tmp_path):
+    path = tmp_path / 'samples.bba'
+    for sample in SAMPLES * 3:
+        with bb.ArchiveWriter(Sample, path, append=True) as writer:
+            writer.write(sample)
+    with bb.ArchiveReader(Sample, path) as reader:
+        assert reader.block_count == 30
+        assert list(reader) == SAMPLES * 3
+        assert reader[13] == SAMPLES[3]
+    # every append leaves the index it replaced behind
+    blocks = sum(len(bb.dumps(sample)) for sample in SAMPLES * 3)
+    dead = sum(24 + 25 * count for count in range(1, 30))
+    assert path.stat().st_size == 40 + blocks + dead + 24 + 25 * 30
+
+
+class Checked(bb.Struct):
+    marker: bb.Const(b'C', bb.Bytes(1))
+    index: bb.Int16ub
+
+
+def test_trusted_reader(tmp_path):
+    path = tmp_path / 'checked.bba'
+    with bb.ArchiveWriter(Checked, path) as writer:
+        writer.write(Checked(b'C', 1))
+    data = path.read_bytes()
+    path.write_bytes(data.replace(b'C\x00\x01', b'X\x00\x01', 1))
+    with bb.ArchiveReader(Checked, path) as reader:
+        with pytest.raises(construct.ConstError):
+            reader[0]
+    with bb.ArchiveReader(Checked, path, trusted=True) as reader:
+        assert reader.read_all(max_workers=2)[0].index == 1
+
+
+def test_unclosed_append(tmp_path):
+    path = tmp_path / 'samples.bba'
+    with bb.ArchiveWriter(Sample, path) as writer:
+        writer.write_many(SAMPLES[:5])
+    # a writer that dies after writing blocks, before writing its index
+    writer = bb.ArchiveWriter(Sample, path, block_records=2, append=True)
+    writer.write_many(SAMPLES[5:])
+    writer._fp.close()
+    with bb.ArchiveReader(Sample, path) as reader:
+        assert list(reader) == SAMPLES[:5]
+    with bb.ArchiveWriter(Sample, path, append=True) as writer:
+        writer.write(SAMPLES[5])
+    with bb.ArchiveReader(Sample, path) as reader:
+        assert list(reader) == SAMPLES[:6]
+
+
+def test_wrong_model(tmp_path):
+    path = tmp_path / 'samples.bba'
+    with bb.ArchiveWriter(Sample, path) as writer:
+        writer.write(SAMPLES[0])
+    with pytest.raises(ValueError):
+        bb.ArchiveReader(Other, path)
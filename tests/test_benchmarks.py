@@ -0,0 +1,21 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+
+def test_memory_benchmark():
+    # run apart, since the benchmark sets the endianness
+    script = pathlib.Path(__file__).with_name('_playground7.py')
+    env = dict(os.environ, ROUNDS='2', RETAINED='10')
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [str(script.parent.parent), env.get('PYTHONPATH')])
+    )
+    result = subprocess.run(
+        [sys.executable, str(script)], env=env, capture_output=True, text=True, check=True
+    )
+    lines = result.stdout.splitlines()
+    for name in ('nested Struct', 'Array of Struct', 'LazyStruct', 'Switch', 'str-heavy'):
+        row = next(line for line in lines if line.startswith(name))
+        loads_peak, dumps_peak = row[len(name):].split()[1:3]
+        assert int(loads_peak) > 0 and int(dumps_peak) > 0
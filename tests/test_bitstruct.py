@@ -0,0 +1,31 @@
+import construct
+import pytest
+
+import bitbin as bb
+from bitbin.impl import structs
+
+
+Int5 = bb.bitwise_int_type(5, endianness='b')
+UInt3 = bb.bitwise_int_type(3, signed=False, endianness='b')
+
+
+class Bits(bb.BitStruct):
+    signed: Int5
+    unsigned: UInt3
+
+
+def test_bit_fields_roundtrip():
+    assert isinstance(Bits._construct(), structs._BitFields)
+    for signed in (-16, -1, 0, 15):
+        for unsigned in (0, 7):
+            data = bb.dumps(Bits(signed, unsigned))
+            assert bb.loads(Bits, data) == Bits(signed, unsigned)
+    assert bb.dumps(Bits(-1, 1)) == b'\xf9'
+
+
+@pytest.mark.parametrize(
+    'signed, unsigned', [(-30, 0), (20, 0), (16, 0), (-17, 0), (0, 8), (0, -1)]
+)
+def test_bit_fields_out_of_range(signed, unsigned):
+    with pytest.raises(construct.IntegerError):
+        bb.dumps(Bits(signed, unsigned))
@@ -0,0 +1,44 @@
+import sys
+
+import bitbin as bb
+from bitbin import __main__ as cli
+from bitbin import codegen
+
+
+class Point(bb.Struct):
+    x: bb.Int16sb
+    y: bb.Int16sb
+
+
+class Shape(bb.Struct):
+    name: str
+    tag: bb.interned_str
+    count: bb.Int8ub
+    points: bb.Array(bb.this.count, Point)
+
+
+SHAPE = Shape('triangle', 'poly', 3, [Point(0, 0), Point(-1, 5), Point(4, 2)])
+
+
+def _codecs(source):
+    namespace = {}
+    exec(compile(source, 'codecs', 'exec'), namespace)
+    return namespace
+
+
+def test_generated_codecs():
+    source, skipped = codegen.generate_codecs(sys.modules[__name__])
+    assert not skipped
+    codecs = _codecs(source)
+    data = bb.dumps(SHAPE)
+    assert codecs['dumps_Shape'](SHAPE) == data
+    assert codecs['loads_Shape'](data) == SHAPE
+    point, offset = codecs['load_Point'](b'\x00' + data[-4:], 1)
+    assert point == Point(4, 2) and offset == 5
+
+
+def test_compile_command(tmp_path):
+    output = tmp_path / 'codecs.py'
+    assert cli.main(['compile', __name__, '-o', str(output)]) == 0
+    codecs = _codecs(output.read_text())
+    assert codecs['loads_Point'](bb.dumps(Point(1, -2))) == Point(1, -2)
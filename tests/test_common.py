@@ -0,0 +1,33 @@
+import io
+
+import construct
+import pytest
+
+import bitbin as bb
+
+
+class Tag(bb.Struct):
+    symbol: bb.interned_str
+    size: bb.Int8ub
+
+
+Tags = bb.GreedyRange(Tag)
+
+
+def test_interned_str_roundtrip():
+    data = b'AAPL\x00\x01' + b'MSFT\x00\x02'
+    assert bb.loads(Tags, data) == [Tag('AAPL', 1), Tag('MSFT', 2)]
+    assert bb.dumps(Tag('AAPL', 1)) == data[:6]
+
+
+def test_interned_str_shares_values():
+    first, second = bb.loads(Tags, b'GOOG\x00\x01GOOG\x00\x02')
+    assert first.symbol is second.symbol
+    # streams other than BytesIO take the generic path
+    stream = io.BufferedReader(io.BytesIO(b'GOOG\x00\x03'))
+    assert bb.load(Tag, stream).symbol is first.symbol
+
+
+def test_interned_str_missing_terminator():
+    with pytest.raises(construct.StreamError):
+        bb.loads(Tag, b'GOOG')
@@ -0,0 +1,65 @@
+import os
+
+import construct as _lib
+
+import bitbin as bb
+
+
+SCHEMA = _lib.Struct('a' / _lib.Int16ub, 'b' / _lib.PascalString(_lib.Int8ub, 'utf8'))
+
+
+def test_fingerprint_is_stable_per_schema():
+    same = _lib.Struct('a' / _lib.Int16ub, 'b' / _lib.PascalString(_lib.Int8ub, 'utf8'))
+    other = _lib.Struct('a' / _lib.Int16ul, 'b' / _lib.PascalString(_lib.Int8ub, 'utf8'))
+    assert bb.fingerprint(SCHEMA) == bb.fingerprint(same)
+    assert bb.fingerprint(SCHEMA) != bb.fingerprint(other)
+
+
+def test_compile_construct_cache(tmp_path):
+    first = bb.compile_construct(SCHEMA, cache_dir=tmp_path)
+    entries = os.listdir(tmp_path)
+    assert len(entries) == 1
+    cached = bb.compile_construct(SCHEMA, cache_dir=tmp_path)
+    data = b'\x00\x05\x02hi'
+    assert first.parse(data) == cached.parse(data) == SCHEMA.parse(data)
+    assert cached.build({'a': 5, 'b': 'hi'}) == data
+    assert os.listdir(tmp_path) == entries
+
+
+def test_compiled_model(tmp_path):
+    bb.set_cache_dir(tmp_path)
+    try:
+        class Compiled(bb.Struct, compiled=True):
+            a: bb.Int16ub
+            b: bb.Int8ub
+
+        assert bb.loads(Compiled, b'\x00\x01\x02') == Compiled(1, 2)
+        assert bb.dumps(Compiled(1, 2)) == b'\x00\x01\x02'
+    finally:
+        bb.set_cache_dir(None)
+
+
+def _validated(limit):
+    return _lib.ExprValidator(_lib.Int8ub, lambda obj, ctx: obj < limit)
+
+
+def test_fingerprint_covers_closures():
+    assert bb.fingerprint(_validated(3)) == bb.fingerprint(_validated(3))
+    assert bb.fingerprint(_validated(3)) != bb.fingerprint(_validated(4))
+
+
+class _Custom(_lib.Construct):
+    def _emitparse(self, code):
+        return '0'
+
+
+class _Upgraded(_lib.Construct):
+    def _emitparse(self, code):
+        return '1'
+
+
+def test_fingerprint_covers_bitbin_constructs():
+    # same qualified name, different code, as after upgrading bitbin
+    for cls in (_Custom, _Upgraded):
+        cls.__module__, cls.__qualname__ = 'bitbin.custom', 'Custom'
+    assert bb.fingerprint(_Custom()) != bb.fingerprint(_Upgraded())
@@ -0,0 +1,231 @@
+import copy
+import io
+import pickle
+
+import construct
+import pytest
+
+import bitbin as bb
+
+
+class Header(bb.Struct, retain_source=True):
+    seq: bb.Int16ub
+    flags: bb.Int8ub
+
+
+class Message(bb.Struct, retain_source=True):
+    header: Header
+    text: str
+
+
+MESSAGE = b'\x00\x01\x02hi\x00'
+
+
+def test_retained_source_roundtrip():
+    message = bb.loads(Message, MESSAGE)
+    assert message == Message(Header(1, 2), 'hi')
+    assert bytes(message._source) == MESSAGE
+    assert bb.dumps(message) == MESSAGE
+
+
+def test_assignment_invalidates_source():
+    message = bb.loads(Message, MESSAGE)
+    message.text = 'bye'
+    assert bb.dumps(message) == b'\x00\x01\x02bye\x00'
+
+
+def test_nested_assignment_invalidates_parent_source():
+    message = bb.loads(Message, MESSAGE)
+    message.header.seq = 9
+    assert bb.dumps(message) == b'\x00\x09\x02hi\x00'
+    assert bb.loads(Message, bb.dumps(message)).header.seq == 9
+
+
+class Point(bb.Struct):
+    x: bb.Int16ub
+    y: bb.Int16ub
+
+
+def test_bind_patches_buffer():
+    buffer = bytearray(b'\xff\x00\x01\x00\x02')
+    point = bb.bind(Point, buffer, 1)
+    assert point == Point(1, 2) and Point(1, 2) == point
+    assert repr(point) == repr(Point(1, 2))
+    point.y = 7
+    assert bb.flush(point) == 1
+    assert buffer == b'\xff\x00\x01\x00\x07'
+
+
+def test_bind_leaves_model_untouched():
+    bb.bind(Point, bytearray(4))
+    assert Point.__setattr__ is object.__setattr__
+    point = Point(1, 2)
+    point.x = 3
+    assert type(point) is Point
+    assert '_source' not in vars(point)
+
+
+class Line(bb.Struct):
+    start: Point
+    end: Point
+    label: str
+
+
+LINE = b'\x00\x01\x00\x02\x00\x03\x00\x04ab\x00'
+
+
+def test_as_record():
+    line = bb.loads(Line, LINE, as_record=True)
+    assert isinstance(line, bb.record_type(Line))
+    assert line == (bb.record_type(Point)(1, 2), (3, 4), 'ab')
+    assert line.end.y == 4
+    assert {line: 1}[bb.loads(Line, LINE, as_record=True)] == 1
+    assert bb.dumps(line) == LINE
+    with pytest.raises(AttributeError):
+        line.label = 'cd'
+
+
+Words = bb.Array(3, bb.Int16ub)
+PackedWords = bb.Prefixed(construct.Int8ub, model=Words)
+
+
+class Entry(bb.Struct):
+    name: str
+    packed: PackedWords
+    words: Words
+    seq: bb.Int32ub
+
+
+ENTRY = bb.dumps(Entry('ab', [4, 5, 6], [1, 2, 3], 9))
+
+
+class _Unseekable(io.RawIOBase):
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._stream.readinto(buffer)
+
+
+def test_skip():
+    stream = io.BytesIO(ENTRY + LINE)
+    assert bb.skip(Entry, stream) == len(ENTRY)
+    assert bb.load(Line, stream).label == 'ab'
+    unseekable = _Unseekable(ENTRY + b'rest')
+    assert bb.skip(Entry, unseekable) == len(ENTRY)
+    assert unseekable.read() == b'rest'
+
+
+def test_skip_bytes():
+    assert bb.skip_bytes(Entry, ENTRY * 2) == len(ENTRY)
+    assert bb.skip_bytes(Entry, ENTRY * 2, len(ENTRY)) == 2 * len(ENTRY)
+    with pytest.raises(construct.StreamError):
+        bb.skip_bytes(Entry, ENTRY[:-1])
+
+
+def test_load_fields():
+    entry = bb.loads(Entry, ENTRY, fields=['words', 'seq'])
+    assert entry.words == [1, 2, 3] and entry.seq == 9
+    assert entry.name is bb.not_loaded and entry.packed is bb.not_loaded
+    assert entry == bb.load(Entry, io.BytesIO(ENTRY), fields=('seq', 'words'))
+    assert repr(entry) == "Entry(name=<not loaded>, packed=<not loaded>, words=[1, 2, 3], seq=9)"
+    with pytest.raises(ValueError):
+        bb.dumps(entry)
+    assert bb.loads(Entry, ENTRY, fields='seq').seq == 9
+    with pytest.raises(ValueError, match='size'):
+        bb.loads(Entry, ENTRY, fields=['size', 'seq'])
+    with pytest.raises(TypeError):
+        bb.loads(Words, ENTRY, fields=['seq'])
+
+
+Magic = bb.Const(b'BB', bb.Bytes(2))
+
+
+class Packet(bb.Struct):
+    magic: Magic
+    seq: bb.Int8ub
+
+
+def test_trusted_load():
+    assert bb.load(Packet, io.BytesIO(b'XX\x01'), trusted=True).seq == 1
+    with pytest.raises(construct.ConstError):
+        bb.load(Packet, io.BytesIO(b'XX\x01'))
+
+
+def test_warmup():
+    class Inner(bb.Struct):
+        value: bb.Int8ub
+
+    class Outer(bb.Struct):
+        inner: Inner
+        values: bb.Array(2, Inner)
+
+    assert {Inner, Outer} <= set(bb.registered_models())
+    assert Outer._cache is None and Inner._cache is None
+    assert bb.warmup(Outer, recursive=False) == 1
+    assert Outer._cache is not None
+    assert bb.warmup(Outer) >= 3
+    assert Inner._cache is not None and Outer._layout() is not None
+
+
+class Slotted(bb.Struct, slots=True, retain_source=True):
+    seq: bb.Int16ub
+
+
+@pytest.mark.parametrize('model, data', [(Message, MESSAGE), (Slotted, b'\x00\x05')])
+def test_retained_source_pickle(model, data):
+    instance = bb.loads(model, data)
+    for copied in (pickle.loads(pickle.dumps(instance)), copy.deepcopy(instance)):
+        assert copied == instance
+        assert getattr(copied, '_source', None) is None
+        assert bb.dumps(copied) == data
+
+
+def test_bound_pickle():
+    point = pickle.loads(pickle.dumps(bb.bind(Point, bytearray(b'\x00\x01\x00\x02'))))
+    assert type(point) is Point and point == Point(1, 2)
+
+
+Version = bb.Rebuild(lambda context: context._params.get('version', 1), bb.Int8ub)
+
+
+class Versioned(bb.Struct, retain_source=True):
+    version: Version
+
+
+class Wrapper(bb.Struct):
+    inner: Versioned
+
+
+def test_retained_source_with_context():
+    versioned = bb.loads(Versioned, b'\x01')
+    assert bb.dumps(versioned) == b'\x01'
+    assert bb.dumps(versioned, version=2) == b'\x02'
+    wrapper = bb.loads(Wrapper, b'\x01')
+    assert bb.dumps(wrapper) == b'\x01'
+    assert bb.dumps(wrapper, version=2) == b'\x02'
+
+
+Kind = bb.Adapter(
+    lambda value, context: 'wide' if value else 'narrow',
+    lambda value, context: int(value == 'wide'),
+    bb.Int8ub,
+)
+Payload = bb.Switch(bb.this.kind, cases={'narrow': bb.Int8ub, 'wide': bb.Int32ub})
+
+
+class Variant(bb.Struct):
+    kind: Kind
+    payload: Payload
+
+
+WIDE = b'\x01\x00\x00\x01\x00'
+
+
+def test_skip_decodes_adapted_keys():
+    assert bb.loads(Variant, WIDE) == Variant('wide', 256)
+    assert bb.skip_bytes(Variant, WIDE + b'rest') == len(WIDE)
+    assert bb.loads(Variant, WIDE, fields=['payload']).payload == 256
@@ -0,0 +1,206 @@
+import array
+import datetime
+import enum
+import io
+
+import construct
+import pytest
+
+import bitbin as bb
+
+
+class Item(bb.Struct):
+    index: bb.Int32ub
+    name: str
+
+
+Items = bb.GreedyRange(Item)
+CompressedItems = bb.Compressed('zlib', Items)
+StreamedItems = bb.Compressed('zlib', Items, streaming=True, chunk_size=64)
+
+
+class Batch(bb.Struct):
+    items: CompressedItems
+
+
+class StreamedBatch(bb.Struct):
+    items: StreamedItems
+
+
+ITEMS = [Item(i, f'item {i}') for i in range(500)]
+
+
+@pytest.mark.parametrize('model', [Batch, StreamedBatch])
+def test_compressed_roundtrip(model):
+    data = bb.dumps(model(ITEMS))
+    assert bb.loads(model, data) == model(ITEMS)
+
+
+def test_streamed_compressed_matches_buffered():
+    data = bb.dumps(Batch(ITEMS))
+    assert bb.loads(StreamedBatch, data).items == ITEMS
+    assert bb.loads(Batch, bb.dumps(StreamedBatch(ITEMS))).items == ITEMS
+
+
+class Color(enum.IntEnum):
+    RED = 1
+    GREEN = 2
+
+
+class Perm(enum.IntFlag):
+    R = 4
+    W = 2
+    X = 1
+
+
+ColorField = bb.Enum[Color, bb.Int8ul]
+PermField = bb.FlagsEnum[Perm, bb.Int8ul]
+
+
+class File(bb.Struct):
+    color: ColorField
+    perm: PermField
+
+
+def test_enum_load():
+    file = bb.loads(File, b'\x02\x06')
+    assert file.color is Color.GREEN
+    assert file.perm == Perm.R | Perm.W and isinstance(file.perm, Perm)
+    # values without a member load as plain ints
+    assert bb.loads(File, b'\x09\x00').color == 9
+
+
+def test_enum_dump():
+    assert bb.dumps(File(Color.RED, Perm.X)) == b'\x01\x01'
+    assert bb.dumps(File('RED', 'R|X')) == b'\x01\x05'
+    assert bb.dumps(File(2, {'W': True, 'R': False})) == b'\x02\x02'
+
+
+batches = []
+
+
+def _decode_tenths(values, context):
+    batches.append(values)
+    return tuple(value / 10 for value in values)
+
+
+def _encode_tenths(values, context):
+    return [round(value * 10) for value in values]
+
+
+Tenths = bb.Adapter(
+    lambda value, context: value / 10,
+    lambda value, context: round(value * 10),
+    bb.Int16ub,
+    batch_decoder=_decode_tenths,
+    batch_encoder=_encode_tenths,
+)
+Prices = bb.Array(3, Tenths)
+Stamps = bb.GreedyRange(bb.TimestampAdapter(bb.Int32ub))
+
+
+class Quote(bb.Struct):
+    prices: Prices
+    last: Tenths
+    stamps: Stamps
+
+
+QUOTE = b'\x00\x01\x00\x02\x00\x03\x00\x05\x00\x00\x00\x3c'
+
+
+def test_batch_adapter():
+    batches.clear()
+    quote = bb.loads(Quote, QUOTE)
+    # the whole array went through the batch decoder once, the single field did not
+    assert batches == [array.array('h', [1, 2, 3])]
+    assert quote.prices == (0.1, 0.2, 0.3) and quote.last == 0.5
+    assert quote.stamps == [datetime.datetime(1970, 1, 1, 0, 1, tzinfo=datetime.timezone.utc)]
+    assert bb.dumps(quote) == QUOTE
+    assert Tenths._batch_adapter() is Tenths._batch_adapter()
+
+
+Marker = bb.Const(b'R', bb.Bytes(1))
+
+
+class Reading(bb.Struct):
+    marker: Marker
+    value: bb.Int8ub
+
+
+Readings = bb.GreedyRange(Reading)
+UntilZero = bb.RepeatUntil(lambda reading, readings, context: reading.value == 0, Reading)
+
+
+def test_iter_load():
+    stream = io.BytesIO()
+    assert bb.dump_iter(Readings, stream, (Reading(b'R', value) for value in range(3))) == 3
+    stream.seek(0)
+    elements = bb.iter_load(Readings, stream)
+    assert next(elements) == Reading(b'R', 0)
+    assert list(elements) == [Reading(b'R', 1), Reading(b'R', 2)]
+
+
+def test_iter_load_repeat_until():
+    stream = io.BytesIO()
+    assert bb.dump_iter(UntilZero, stream, [Reading(b'R', 5), Reading(b'R', 0)] * 2) == 2
+    stream.write(b'R\x07')
+    stream.seek(0)
+    assert [reading.value for reading in bb.iter_load(UntilZero, stream)] == [5, 0]
+    assert stream.read() == b'R\x07'
+
+
+def test_iter_load_trusted():
+    data = b'R\x01X\x02'
+    assert [reading.value for reading in bb.iter_load(Readings, io.BytesIO(data))] == [1]
+    elements = bb.iter_load(Readings, io.BytesIO(data), trusted=True)
+    assert [reading.value for reading in elements] == [1, 2]
+    assert not bb.is_trusted()
+
+
+def test_trusted_features():
+    data = b'R\x01X\x02'
+    with pytest.raises(construct.ConstError):
+        bb.loads(bb.Array(2, Reading), data)
+    assert [r.value for r in bb.loads(bb.Array(2, Reading), data, trusted=True)] == [1, 2]
+    assert [r.value for r in bb.loads(Readings, data)] == [1]
+    assert [r.value for r in bb.loads(Readings, data, trusted=True)] == [1, 2]
+    assert bb.load(Readings, io.BytesIO(data), trusted=True)[1].value == 2
+    assert bb.loads(Marker, b'X', trusted=True) == b'R'
+
+
+class _Unseekable(io.RawIOBase):
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._stream.readinto(buffer)
+
+
+class StreamedBatchWithTrailer(bb.Struct):
+    items: StreamedItems
+    trailer: bb.Int8ub
+
+
+def test_streamed_compressed_gives_back_surplus():
+    data = bb.dumps(StreamedBatchWithTrailer(ITEMS[:3], 7))
+    assert bb.loads(StreamedBatchWithTrailer, data).trailer == 7
+    with pytest.raises(construct.StreamError):
+        bb.load(StreamedBatch, _Unseekable(data))
+    assert bb.load(StreamedBatch, _Unseekable(data[:-1])).items == ITEMS[:3]
+
+
+def test_streamed_compressed_iter_load():
+    stream = io.BytesIO()
+    assert bb.dump_iter(StreamedItems, stream, iter(ITEMS)) == len(ITEMS)
+    stream.write(b'\x07')
+    stream.seek(0)
+    elements = bb.iter_load(StreamedItems, stream)
+    assert next(elements) == ITEMS[0]
+    assert list(elements) == ITEMS[1:]
+    assert stream.read() == b'\x07'
+    assert bb.loads(StreamedItems, stream.getvalue()[:-1]) == ITEMS
+    with pytest.raises(TypeError):
+        next(bb.iter_load(CompressedItems, io.BytesIO()))
@@ -0,0 +1,79 @@
+import zlib
+
+import construct
+import pytest
+
+import bitbin as bb
+
+
+class Body(bb.Struct):
+    seq: bb.Int16ub
+    text: str
+
+
+ChecksummedBody = bb.Checksum('crc32', Body)
+
+
+class Frame(bb.Struct):
+    body: ChecksummedBody
+
+
+def test_checksum_roundtrip():
+    data = bb.dumps(Frame(Body(7, 'hello')))
+    body = data[:-4]
+    assert data[-4:] == zlib.crc32(body).to_bytes(4, 'big')
+    assert bb.loads(Frame, data) == Frame(Body(7, 'hello'))
+
+
+def test_checksum_mismatch():
+    data = bytearray(bb.dumps(Frame(Body(7, 'hello'))))
+    data[0] ^= 1
+    with pytest.raises(construct.ChecksumError):
+        bb.loads(Frame, bytes(data))
+    assert bb.loads(Frame, bytes(data), verify_checksums=False).body.seq == 7 ^ 256
+
+
+class Tagged(bb.Struct):
+    kind: bb.Int8ub
+    payload: bb.Switch[bb.this.kind, bb.Int8ub]
+
+
+def test_switch_register_after_load():
+    assert bb.loads(Tagged, b'\x01\x05').payload == 5
+    bb.models(Tagged).payload.register(2, bb.Int16ub)
+    tagged = bb.loads(Tagged, b'\x02\x01\x00')
+    assert tagged.payload == 256
+    assert bb.dumps(tagged) == b'\x02\x01\x00'
+    with pytest.raises(ValueError):
+        bb.models(Tagged).payload.register(2, bb.Int32ub)
+
+
+class Pair(bb.Sequence):
+    _models = [bb.Int8ub, str]
+
+
+class Focused(bb.FocusedSeq):
+    _parsebuildfrom = 'value'
+    _models = [
+        bb.Renamed('pad', model=bb.Const(b'\x00', bb.Bytes(1))),
+        bb.Renamed('value', model=bb.Int16ub),
+    ]
+
+
+class Holder(bb.Struct):
+    focused: Focused
+    pair: Pair
+
+
+def test_sequence():
+    pair = bb.loads(Pair, b'\x07ab\x00')
+    assert type(pair) is Pair and pair == Pair(7, 'ab')
+    assert bb.loads(Pair, b'\x07ab\x00', as_record=True) == (7, 'ab')
+    assert bb.dumps(pair) == b'\x07ab\x00'
+
+
+def test_focused_seq():
+    assert bb.loads(Focused, b'\x00\x01\x02') == 258
+    holder = bb.loads(Holder, b'\x00\x01\x02\x07ab\x00')
+    assert holder == Holder(258, [7, 'ab'])
+    assert bb.dumps(holder) == b'\x00\x01\x02\x07ab\x00'
@@ -0,0 +1,36 @@
+import bitbin as bb
+
+
+class Point(bb.Struct):
+    x: bb.Int8ub
+    y: bb.Int8ub
+
+
+def test_instrument_models_and_fields():
+    with bb.instrument(fields=True) as inst:
+        inst.reset()
+        point = bb.loads(Point, b'\x01\x02')
+        assert bb.dumps(point) == b'\x01\x02'
+        stats = inst.stats(Point)
+        assert stats.load.calls == 1
+        assert stats.load.nbytes == 2
+        assert stats.dump.calls == 1
+        assert set(stats.fields) == {'x', 'y'}
+        assert stats.fields['x'].load.calls == 1
+        assert stats.fields['x'].init.calls == 1
+    assert not inst.enabled
+    assert '_load_field' not in vars(Point)
+    assert bb.loads(Point, b'\x03\x04') == Point(3, 4)
+
+
+def test_instrument_subclass_defined_while_enabled():
+    with bb.instrument(fields=True) as inst:
+        inst.reset()
+
+        class Late(bb.Struct):
+            value: bb.Int8ub
+
+        assert bb.loads(Late, b'\x07') == Late(7)
+        stats = inst.stats(Late)
+        assert stats.load.calls == 1
+        assert stats.fields['value'].load.calls == 1
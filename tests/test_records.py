@@ -0,0 +1,149 @@
+import io
+import os
+import pathlib
+import queue
+import subprocess
+import sys
+
+import construct
+import pytest
+
+import bitbin as bb
+
+
+class Tick(bb.Struct):
+    price: bb.Int32sb
+    volume: bb.Int32ub
+    total: bb.Int64sb
+
+
+TICKS = [Tick(-5, 2 ** 32 - 1, -2 ** 40), Tick(7, 1, 3)]
+TICK_DATA = b''.join(bb.dumps(tick) for tick in TICKS)
+
+
+def test_load_columns_fixed():
+    columns = bb.load_columns(Tick, TICK_DATA)
+    assert list(columns['price']) == [-5, 7]
+    assert list(columns['volume']) == [2 ** 32 - 1, 1]
+    assert list(columns['total']) == [-2 ** 40, 3]
+    # 32-bit fields get 4-byte columns even where a C long is 8 bytes
+    assert columns['price'].itemsize == 4
+    assert columns['volume'].itemsize == 4
+
+
+def test_load_columns_stream_fields():
+    columns = bb.load_columns(Tick, io.BytesIO(TICK_DATA), fields=['volume'], count=1)
+    assert list(columns) == ['volume']
+    assert list(columns['volume']) == [2 ** 32 - 1]
+
+
+def test_record_file(tmp_path):
+    path = tmp_path / 'ticks.bin'
+    ticks = [Tick(price, price * 10, 0) for price in (1, 3, 3, 8)]
+    path.write_bytes(b'HEAD' + b''.join(bb.dumps(tick) for tick in ticks))
+    with bb.RecordFile(Tick, path, 'price', offset=4) as records:
+        assert len(records) == 4
+        assert records[-1] == ticks[-1]
+        assert list(records.keys()) == [1, 3, 3, 8]
+        assert records.find(3) == ticks[1]
+        assert records.bisect_right(3) == 3
+        assert list(records.between(2, 8)) == ticks[1:3]
+        with pytest.raises(KeyError):
+            records.find(4)
+
+
+def test_loads_many():
+    buffers = [bb.dumps(tick) for tick in TICKS] * 3
+    assert bb.loads_many(Tick, buffers) == TICKS * 3
+    assert bb.loads_many(Tick, buffers, max_workers=2, chunksize=2) == TICKS * 3
+    records = bb.loads_many(Tick, buffers, as_record=True)
+    assert records == [(-5, 2 ** 32 - 1, -2 ** 40), (7, 1, 3)] * 3
+
+
+def test_shared_ring():
+    with bb.SharedRing(Tick, capacity=2) as ring:
+        try:
+            with bb.SharedRing(Tick, ring.name) as consumer:
+                with pytest.raises(queue.Empty):
+                    consumer.get_nowait()
+                ring.put(TICKS[0])
+                ring.put_nowait(TICKS[1])
+                with pytest.raises(queue.Full):
+                    ring.put(TICKS[0], timeout=0.01)
+                assert len(consumer) == 2
+                with consumer.borrow() as view:
+                    assert bytes(view) == bb.dumps(TICKS[0])
+                assert consumer.get(as_record=True) == (7, 1, 3)
+                ring.put(TICKS[0])
+                assert consumer.get() == TICKS[0]
+                assert len(consumer) == 0
+        finally:
+            ring.unlink()
+
+
+_CONSUMER = '''
+import sys
+import bitbin as bb
+from test_records import Tick
+with bb.SharedRing(Tick, sys.argv[1]) as consumer:
+    print(consumer.get().volume)
+'''
+
+
+def test_shared_ring_outlives_consumers():
+    tests = pathlib.Path(__file__).parent
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [str(tests.parent), str(tests), env.get('PYTHONPATH')])
+    )
+    with bb.SharedRing(Tick, capacity=2) as ring:
+        try:
+            for tick in TICKS:
+                ring.put(tick)
+                result = subprocess.run(
+                    [sys.executable, '-c', _CONSUMER, ring.name],
+                    env=env, capture_output=True, text=True, check=True
+                )
+                assert int(result.stdout) == tick.volume
+            # the consumers exiting did not unlink the block
+            with bb.SharedRing(Tick, ring.name) as consumer:
+                ring.put(TICKS[0])
+                assert consumer.get() == TICKS[0]
+        finally:
+            ring.unlink()
+
+
+def test_shared_ring_machine(monkeypatch):
+    monkeypatch.setattr('platform.machine', lambda: 'aarch64')
+    with pytest.raises(RuntimeError, match='aarch64'):
+        bb.SharedRing(Tick, capacity=2)
+
+
+class Label(bb.Struct):
+    id: bb.Int16ub
+    text: str
+
+
+class _Unseekable(io.RawIOBase):
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+        self.largest_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        self.largest_read = max(self.largest_read, len(buffer))
+        return self._stream.readinto(buffer)
+
+
+def test_load_columns_unseekable(monkeypatch):
+    monkeypatch.setattr(bb.records, 'COLUMN_WINDOW_SIZE', 16)
+    labels = [Label(index, 'x' * (index % 7)) for index in range(100)]
+    stream = _Unseekable(b''.join(bb.dumps(label) for label in labels))
+    columns = bb.load_columns(Label, stream)
+    assert list(columns['id']) == list(range(100))
+    assert columns['text'] == [label.text for label in labels]
+    assert stream.largest_read <= 16
+    with pytest.raises(construct.StreamError):
+        bb.load_columns(Label, _Unseekable(bb.dumps(labels[0]) + b'\x00'))
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import pytest
+
+import bitbin as bb
+from bitbin import Int8ub
+
+
+class Header(bb.Struct):
+    kind: Int8ub
+    size: bb.Int16ub
+
+
+class Packet(bb.Struct, slots=True):
+    header: Header
+    flags: Int8ub
+
+
+def test_postponed_annotations():
+    assert bb.loads(Header, b'\x01\x00\x02') == Header(1, 2)
+    packet = bb.loads(Packet, b'\x01\x00\x02\x03')
+    assert packet == Packet(Header(1, 2), 3)
+    assert bb.dumps(packet) == b'\x01\x00\x02\x03'
+
+
+def test_postponed_local_annotations():
+    class Local(bb.Struct):
+        header: Header
+        count: Int8ub
+
+    class SlottedLocal(bb.Struct, slots=True):
+        header: Header
+        count: Int8ub
+
+    assert bb.loads(Local, b'\x01\x00\x02\x03') == Local(Header(1, 2), 3)
+    assert bb.loads(SlottedLocal, b'\x01\x00\x02\x03') == SlottedLocal(Header(1, 2), 3)
+
+
+def test_slots():
+    packet = Packet(Header(1, 2), 3)
+    assert not hasattr(packet, '__dict__')
+    with pytest.raises(AttributeError):
+        packet.unknown = 1